@@ -0,0 +1,58 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.database import SQLALCHEMY_DATABASE_URL, engine
+from app import models
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = models.Base.metadata
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Los índices declarados con ddl_if (por ejemplo el GIN de búsqueda, solo
+    # en Postgres) no existen en los demás motores
+    ddl_if = getattr(object, "_ddl_if", None)
+    if ddl_if is not None and ddl_if.dialect is not None:
+        return context.get_context().dialect.name == ddl_if.dialect
+    return True
+
+
+def run_migrations_offline() -> None:
+    """Genera el SQL de las migraciones sin conectarse (alembic upgrade --sql)"""
+    context.configure(
+        url=SQLALCHEMY_DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+        render_as_batch=True,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Aplica las migraciones con el mismo engine (y opciones de conexión) de la API"""
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            # SQLite no admite la mayoría de los ALTER TABLE
+            render_as_batch=True,
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
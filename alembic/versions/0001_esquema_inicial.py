@@ -0,0 +1,92 @@
+"""esquema inicial
+
+Tablas tal como las creaba create_all antes de usar migraciones. En una base
+existente se marca como aplicada con `alembic stamp 0001_esquema_inicial`.
+
+Revision ID: 0001_esquema_inicial
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_esquema_inicial"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "concesionarias",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=True),
+        sa.Column("logo_url", sa.String(), nullable=True),
+        sa.Column("color_principal", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_concesionarias_id", "concesionarias", ["id"])
+    op.create_index("ix_concesionarias_nombre", "concesionarias", ["nombre"])
+
+    op.create_table(
+        "marcas",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_marcas_id", "marcas", ["id"])
+    op.create_index("ix_marcas_nombre", "marcas", ["nombre"], unique=True)
+
+    op.create_table(
+        "usuarios",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nombre", sa.String(), nullable=True),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("contraseña", sa.String(), nullable=True),
+        sa.Column("concesionaria_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["concesionaria_id"], ["concesionarias.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_usuarios_email", "usuarios", ["email"], unique=True)
+    op.create_index("ix_usuarios_id", "usuarios", ["id"])
+
+    op.create_table(
+        "vehiculos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("modelo", sa.String(), nullable=True),
+        sa.Column("anio", sa.Integer(), nullable=True),
+        sa.Column("color", sa.String(), nullable=True),
+        sa.Column("estado", sa.String(), nullable=True),
+        sa.Column("precio", sa.Integer(), nullable=True),
+        sa.Column("descripcion", sa.Text(), nullable=True),
+        sa.Column("marca_id", sa.Integer(), nullable=True),
+        sa.Column("concesionaria_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["concesionaria_id"], ["concesionarias.id"]),
+        sa.ForeignKeyConstraint(["marca_id"], ["marcas.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_vehiculos_id", "vehiculos", ["id"])
+    op.create_index("ix_vehiculos_modelo", "vehiculos", ["modelo"])
+
+    op.create_table(
+        "imagenes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("url", sa.String(), nullable=True),
+        sa.Column("vehiculo_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["vehiculo_id"], ["vehiculos.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_imagenes_id", "imagenes", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("imagenes")
+    op.drop_table("vehiculos")
+    op.drop_table("usuarios")
+    op.drop_table("marcas")
+    op.drop_table("concesionarias")
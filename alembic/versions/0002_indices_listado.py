@@ -0,0 +1,39 @@
+"""índices del listado de vehículos
+
+Ordenamiento por precio y año, filtros combinados y búsqueda por prefijo
+de modelo sin distinguir mayúsculas.
+
+Revision ID: 0002_indices_listado
+Revises: 0001_esquema_inicial
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_indices_listado"
+down_revision: Union[str, None] = "0001_esquema_inicial"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_vehiculos_precio_id", "vehiculos", ["precio", "id"])
+    op.create_index("ix_vehiculos_anio_id", "vehiculos", ["anio", "id"])
+    op.create_index("ix_vehiculos_estado_precio_id", "vehiculos", ["estado", "precio", "id"])
+    op.create_index("ix_vehiculos_concesionaria_estado_precio", "vehiculos", ["concesionaria_id", "estado", "precio"])
+    op.create_index("ix_vehiculos_marca_anio", "vehiculos", ["marca_id", "anio"])
+    op.create_index("ix_vehiculos_modelo_lower", "vehiculos", [sa.text("lower(modelo)")])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_vehiculos_modelo_lower", table_name="vehiculos")
+    op.drop_index("ix_vehiculos_marca_anio", table_name="vehiculos")
+    op.drop_index("ix_vehiculos_concesionaria_estado_precio", table_name="vehiculos")
+    op.drop_index("ix_vehiculos_estado_precio_id", table_name="vehiculos")
+    op.drop_index("ix_vehiculos_anio_id", table_name="vehiculos")
+    op.drop_index("ix_vehiculos_precio_id", table_name="vehiculos")
@@ -0,0 +1,52 @@
+"""texto de búsqueda de vehículos
+
+Agrega vehiculos.texto_busqueda (modelo, marca y descripción), lo completa
+para los vehículos existentes y, en Postgres, crea el índice GIN de la
+búsqueda de texto completo.
+
+Revision ID: 0003_texto_busqueda
+Revises: 0002_indices_listado
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_texto_busqueda"
+down_revision: Union[str, None] = "0002_indices_listado"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("vehiculos", sa.Column("texto_busqueda", sa.Text(), nullable=True))
+
+    op.execute(
+        "UPDATE vehiculos SET texto_busqueda = "
+        "coalesce(modelo, '') || ' ' || "
+        "coalesce((SELECT marcas.nombre FROM marcas WHERE marcas.id = vehiculos.marca_id), '') || ' ' || "
+        "coalesce(descripcion, '')"
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        op.create_index(
+            "ix_vehiculos_texto_busqueda",
+            "vehiculos",
+            [sa.text("to_tsvector('spanish'::regconfig, texto_busqueda)")],
+            postgresql_using="gin",
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_vehiculos_texto_busqueda", table_name="vehiculos")
+    with op.batch_alter_table("vehiculos") as batch_op:
+        batch_op.drop_column("texto_busqueda")
+    if op.get_bind().dialect.name == "sqlite":
+        # En SQLite el modo batch recrea la tabla y no conserva los índices
+        # de expresiones
+        op.create_index("ix_vehiculos_modelo_lower", "vehiculos", [sa.text("lower(modelo)")])
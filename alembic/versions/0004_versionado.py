@@ -0,0 +1,48 @@
+"""versión y fecha de modificación
+
+Columnas version y updated_at de concesionarias, marcas y vehículos, usadas
+como validadores HTTP (ETag / Last-Modified).
+
+Revision ID: 0004_versionado
+Revises: 0003_texto_busqueda
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_versionado"
+down_revision: Union[str, None] = "0003_texto_busqueda"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLAS = ("concesionarias", "marcas", "vehiculos")
+
+
+def _restaurar_indices_sqlite() -> None:
+    # En SQLite el modo batch recrea la tabla y no conserva los índices de
+    # expresiones
+    if op.get_bind().dialect.name == "sqlite":
+        op.create_index("ix_vehiculos_modelo_lower", "vehiculos", [sa.text("lower(modelo)")])
+
+
+def upgrade() -> None:
+    for tabla in TABLAS:
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.add_column(sa.Column("version", sa.Integer(), server_default="1", nullable=False))
+            batch_op.add_column(sa.Column(
+                "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False
+            ))
+    _restaurar_indices_sqlite()
+
+
+def downgrade() -> None:
+    for tabla in TABLAS:
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.drop_column("updated_at")
+            batch_op.drop_column("version")
+    _restaurar_indices_sqlite()
@@ -0,0 +1,64 @@
+"""proyección vehiculos_resumen
+
+Tabla desnormalizada de las tarjetas del listado, completada a partir de
+los vehículos existentes.
+
+Revision ID: 0005_resumen_vehiculos
+Revises: 0004_versionado
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_resumen_vehiculos"
+down_revision: Union[str, None] = "0004_versionado"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "vehiculos_resumen",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("modelo", sa.String(), nullable=True),
+        sa.Column("anio", sa.Integer(), nullable=True),
+        sa.Column("color", sa.String(), nullable=True),
+        sa.Column("estado", sa.String(), nullable=True),
+        sa.Column("precio", sa.Integer(), nullable=True),
+        sa.Column("marca_id", sa.Integer(), nullable=True),
+        sa.Column("concesionaria_id", sa.Integer(), nullable=True),
+        sa.Column("marca", sa.String(), nullable=True),
+        sa.Column("concesionaria", sa.String(), nullable=True),
+        sa.Column("miniatura_url", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["id"], ["vehiculos.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_vehiculos_resumen_precio_id", "vehiculos_resumen", ["precio", "id"])
+    op.create_index("ix_vehiculos_resumen_anio_id", "vehiculos_resumen", ["anio", "id"])
+    op.create_index("ix_vehiculos_resumen_estado_precio_id", "vehiculos_resumen", ["estado", "precio", "id"])
+    op.create_index(
+        "ix_vehiculos_resumen_concesionaria_estado_precio", "vehiculos_resumen",
+        ["concesionaria_id", "estado", "precio"]
+    )
+    op.create_index("ix_vehiculos_resumen_marca_anio", "vehiculos_resumen", ["marca_id", "anio"])
+    op.create_index("ix_vehiculos_resumen_modelo_lower", "vehiculos_resumen", [sa.text("lower(modelo)")])
+
+    op.execute(
+        "INSERT INTO vehiculos_resumen "
+        "(id, modelo, anio, color, estado, precio, marca_id, concesionaria_id, marca, concesionaria, miniatura_url) "
+        "SELECT v.id, v.modelo, v.anio, v.color, v.estado, v.precio, v.marca_id, v.concesionaria_id, "
+        "m.nombre, c.nombre, "
+        "(SELECT i.url FROM imagenes i WHERE i.vehiculo_id = v.id ORDER BY i.id LIMIT 1) "
+        "FROM vehiculos v "
+        "LEFT OUTER JOIN marcas m ON m.id = v.marca_id "
+        "LEFT OUTER JOIN concesionarias c ON c.id = v.concesionaria_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("vehiculos_resumen")
@@ -0,0 +1,46 @@
+"""tareas en segundo plano y miniaturas
+
+Tabla de la cola de tareas y columna con la miniatura de cada imagen.
+
+Revision ID: 0006_tareas
+Revises: 0005_resumen_vehiculos
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_tareas"
+down_revision: Union[str, None] = "0005_resumen_vehiculos"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tareas",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tipo", sa.String(), nullable=False),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("estado", sa.String(), nullable=False),
+        sa.Column("intentos", sa.Integer(), nullable=False),
+        sa.Column("max_intentos", sa.Integer(), nullable=False),
+        sa.Column("disponible_en", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_tareas_estado_disponible_en", "tareas", ["estado", "disponible_en"])
+    op.add_column("imagenes", sa.Column("miniatura_url", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("imagenes") as batch_op:
+        batch_op.drop_column("miniatura_url")
+    op.drop_index("ix_tareas_estado_disponible_en", table_name="tareas")
+    op.drop_table("tareas")
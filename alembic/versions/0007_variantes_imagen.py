@@ -0,0 +1,28 @@
+"""versiones reducidas de las imágenes
+
+Revision ID: 0007_variantes_imagen
+Revises: 0006_tareas
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_variantes_imagen"
+down_revision: Union[str, None] = "0006_tareas"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Las imágenes existentes quedan sin variantes y se sirven en su tamaño original
+    op.add_column("imagenes", sa.Column("variantes", sa.JSON(), server_default="[]", nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("imagenes") as batch_op:
+        batch_op.drop_column("variantes")
@@ -0,0 +1,55 @@
+"""estadísticas agregadas de vehículos
+
+Tabla de agregados por concesionaria, marca y estado, completada a partir
+de los vehículos existentes.
+
+Revision ID: 0008_estadisticas_vehiculos
+Revises: 0007_variantes_imagen
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_estadisticas_vehiculos"
+down_revision: Union[str, None] = "0007_variantes_imagen"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "estadisticas_vehiculos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("concesionaria_id", sa.Integer(), nullable=True),
+        sa.Column("marca_id", sa.Integer(), nullable=True),
+        sa.Column("estado", sa.String(), nullable=True),
+        sa.Column("cantidad", sa.Integer(), nullable=False),
+        sa.Column("con_precio", sa.Integer(), nullable=False),
+        sa.Column("suma_precio", sa.BigInteger(), nullable=False),
+        sa.Column("precio_min", sa.Integer(), nullable=True),
+        sa.Column("precio_max", sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_estadisticas_vehiculos_grupo", "estadisticas_vehiculos", ["concesionaria_id", "marca_id", "estado"]
+    )
+    op.execute(
+        """
+        INSERT INTO estadisticas_vehiculos
+            (concesionaria_id, marca_id, estado, cantidad, con_precio, suma_precio, precio_min, precio_max)
+        SELECT concesionaria_id, marca_id, estado, count(*), count(precio),
+               coalesce(sum(precio), 0), min(precio), max(precio)
+        FROM vehiculos
+        GROUP BY concesionaria_id, marca_id, estado
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_estadisticas_vehiculos_grupo", table_name="estadisticas_vehiculos")
+    op.drop_table("estadisticas_vehiculos")
@@ -0,0 +1,28 @@
+"""índice de las imágenes por vehículo
+
+Sin él, cargar las imágenes de un vehículo y calcular la miniatura del
+resumen recorren la tabla imagenes completa.
+
+Revision ID: 0009_indice_imagenes_vehiculo
+Revises: 0008_estadisticas_vehiculos
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_indice_imagenes_vehiculo"
+down_revision: Union[str, None] = "0008_estadisticas_vehiculos"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_imagenes_vehiculo_id", "imagenes", ["vehiculo_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_imagenes_vehiculo_id", table_name="imagenes")
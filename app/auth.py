@@ -1,13 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 from . import models, schemas
+from .cache import TTLCache, cache_en_memoria_habilitada
 from .database import get_db
+from .metrics import register_collector
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,14 +24,43 @@ SECRET_KEY = os.getenv("SECRET_KEY", "tu_clave_secreta_temporal")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Pool acotado para el trabajo de bcrypt (~250 ms de CPU por operación).
+# PASSWORD_WORKERS limita cuántos hashes corren a la vez y PASSWORD_QUEUE_LIMIT
+# cuántos más pueden esperar; por encima de eso se responde 503 en lugar de
+# acaparar el threadpool que atiende al resto de los endpoints.
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "16"))
+
+# Caché token -> usuario autenticado, para no consultar la base en cada
+# petición protegida. Una entrada nunca vive más que el token. Es propia de
+# cada proceso, así que con varios workers solo se activa si se pide.
+USER_CACHE_ENABLED = cache_en_memoria_habilitada("USER_CACHE_ENABLED")
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "300"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+_password_slots = threading.BoundedSemaphore(PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT)
+
+def _run_password_task(fn, *args):
+    if not _password_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, intenta nuevamente en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        return _password_executor.submit(fn, *args).result()
+    finally:
+        _password_slots.release()
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return _run_password_task(pwd_context.verify, plain_password, hashed_password)
 
 def get_password_hash(contraseña):
-    return pwd_context.hash(contraseña)
+    return _run_password_task(pwd_context.hash, contraseña)
 
 def authenticate_user(db: Session, email: str, contraseña: str):
     user = db.query(models.Usuario).filter(models.Usuario.email == email).first()
@@ -42,7 +78,42 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+@dataclass(frozen=True)
+class UsuarioActual:
+    """Datos del usuario autenticado que necesitan los handlers"""
+    id: int
+    nombre: str
+    email: str
+    concesionaria_id: int
+
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def invalidar_usuario(usuario_id: int):
+    """Descarta de la caché todos los tokens del usuario"""
+    _user_cache.delete_where(lambda token, usuario: usuario.id == usuario_id)
+
+def limpiar_cache_usuarios():
+    _user_cache.clear()
+
+# Cualquier cambio o borrado de un usuario invalida sus entradas
+@event.listens_for(models.Usuario, "after_update")
+@event.listens_for(models.Usuario, "after_delete")
+def _invalidar_usuario_modificado(mapper, connection, target):
+    invalidar_usuario(target.id)
+
+@register_collector
+def _user_cache_metrics():
+    return [
+        ("auth_user_cache_hits_total", "counter", "Usuarios resueltos desde la caché", _user_cache.hits),
+        ("auth_user_cache_misses_total", "counter", "Usuarios resueltos consultando la base", _user_cache.misses),
+        ("auth_user_cache_entries", "gauge", "Tokens en la caché de usuarios", len(_user_cache)),
+    ]
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UsuarioActual:
+    usuario = _user_cache.get(token) if USER_CACHE_ENABLED else None
+    if usuario is not None:
+        return usuario
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -60,4 +131,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     user = db.query(models.Usuario).filter(models.Usuario.email == token_data.email).first()
     if user is None:
         raise credentials_exception
-    return user 
\ No newline at end of file
+
+    usuario = UsuarioActual(
+        id=user.id,
+        nombre=user.nombre,
+        email=user.email,
+        concesionaria_id=user.concesionaria_id
+    )
+    ttl = min(USER_CACHE_TTL, payload.get("exp", 0) - time.time())
+    if USER_CACHE_ENABLED and ttl > 0:
+        _user_cache.set(token, usuario, ttl=ttl)
+    return usuario 
\ No newline at end of file
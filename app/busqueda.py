@@ -0,0 +1,39 @@
+from sqlalchemy import func, literal_column, select, update
+from sqlalchemy.orm import Session
+from . import models
+
+def buscar_vehiculos(query, q: str, dialecto: str):
+    """
+    Filtra y ordena por relevancia los vehículos que coinciden con el texto.
+    En Postgres usa el índice GIN sobre texto_busqueda, así que el costo no
+    depende del tamaño del inventario. En otros motores (SQLite local) exige
+    que aparezcan todas las palabras y ordena por id.
+    """
+    v = models.Vehiculo
+    if dialecto == "postgresql":
+        vector = models.search_vector(v.texto_busqueda)
+        consulta = func.plainto_tsquery(literal_column(f"'{models.SEARCH_CONFIG}'::regconfig"), q)
+        return query.filter(vector.op("@@")(consulta)).order_by(
+            func.ts_rank(vector, consulta).desc(), v.id
+        )
+
+    for termino in q.split():
+        patron = termino.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(v.texto_busqueda.ilike(f"%{patron}%", escape="\\"))
+    return query.order_by(v.id)
+
+def actualizar_texto_busqueda(db: Session, marca_id: int = None):
+    """
+    Recalcula texto_busqueda en la base, para todos los vehículos o solo
+    para los de una marca (por ejemplo después de renombrarla)
+    """
+    v = models.Vehiculo
+    nombre_marca = select(models.Marca.nombre).where(models.Marca.id == v.marca_id).scalar_subquery()
+    stmt = update(v).values(
+        texto_busqueda=func.coalesce(v.modelo, "") + " "
+        + func.coalesce(nombre_marca, "") + " "
+        + func.coalesce(v.descripcion, "")
+    )
+    if marca_id is not None:
+        stmt = stmt.where(v.marca_id == marca_id)
+    db.execute(stmt.execution_options(synchronize_session=False))
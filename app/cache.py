@@ -0,0 +1,74 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# Procesos que atienden la API (gunicorn.conf.py exporta la cantidad real de
+# workers). Con más de uno, lo que un proceso invalida en su memoria sigue
+# vigente en los demás.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+def cache_en_memoria_habilitada(variable: str) -> bool:
+    """
+    Lee la variable true/false que activa una caché en memoria del proceso.
+    Sin valor explícito, la caché solo se activa con un único worker.
+    """
+    valor = os.getenv(variable)
+    if valor is None:
+        return WEB_CONCURRENCY <= 1
+    return valor.lower() == "true"
+
+class TTLCache:
+    """
+    Caché en memoria LRU con expiración por entrada. Es seguro usarla desde
+    varios hilos (los handlers síncronos corren en el threadpool).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Elimina las entradas para las que predicate(key, value) es verdadero"""
+        with self._lock:
+            keys = [k for k, (v, _) in self._data.items() if predicate(k, v)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
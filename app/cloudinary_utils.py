@@ -1,35 +1,105 @@
 import cloudinary
 import cloudinary.uploader
-from fastapi import UploadFile
+import cloudinary.utils
+from typing import BinaryIO, List, Optional
 import os
 from dotenv import load_dotenv
+from .imagenes import FORMATOS_VARIANTES, IMAGE_WIDTHS
+from .storage import THUMBNAIL_SIZE, StorageBackend, StorageError
 
 load_dotenv()
 
-# Configuración de Cloudinary
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET")
-)
+# Cloudinary exige bloques de al menos 5 MB en las subidas por partes
+CLOUDINARY_CHUNK_SIZE = 6 * 1024 * 1024
 
-async def upload_image(file: UploadFile) -> str:
+def public_id_from_url(url: str) -> str:
     """
-    Sube una imagen a Cloudinary y retorna la URL
+    Extrae el public_id de una URL de Cloudinary
+    URL típica: https://res.cloudinary.com/cloud_name/image/upload/v1234567890/public_id.jpg
     """
-    try:
-        # Subir el archivo a Cloudinary
-        result = cloudinary.uploader.upload(file.file)
-        return result["secure_url"]
-    except Exception as e:
-        raise Exception(f"Error al subir imagen a Cloudinary: {str(e)}")
-
-async def delete_image(public_id: str) -> bool:
+    return url.split('/')[-1].split('.')[0]  # Obtener el nombre sin extensión
+
+def es_derivada(url: str) -> bool:
     """
-    Elimina una imagen de Cloudinary usando su public_id
+    Indica si la URL es una transformación (.../upload/w_320,f_webp/...):
+    no es un archivo propio y se elimina junto con la original
     """
-    try:
-        result = cloudinary.uploader.destroy(public_id)
-        return result["result"] == "ok"
-    except Exception as e:
-        raise Exception(f"Error al eliminar imagen de Cloudinary: {str(e)}") 
\ No newline at end of file
+    _, _, resto = url.partition("/upload/")
+    return bool(resto) and not resto.startswith("v") and "/" in resto
+
+def url_transformada(url: str, transformacion: str) -> str:
+    return url.replace("/upload/", f"/upload/{transformacion}/", 1)
+
+class CloudinaryStorage(StorageBackend):
+
+    def __init__(self):
+        # Configuración de Cloudinary. Se hace al crear el backend (con el
+        # primer uso en cada worker) y no al importar el módulo.
+        cloudinary.config(
+            cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+            api_key=os.getenv("CLOUDINARY_API_KEY"),
+            api_secret=os.getenv("CLOUDINARY_API_SECRET")
+        )
+        # El uploader guarda un pool de conexiones HTTP a nivel de módulo;
+        # se crea uno nuevo para no compartir sockets con otro proceso
+        cloudinary.uploader._http = cloudinary.utils.get_http_connector(cloudinary.config(), cloudinary.CERT_KWARGS)
+
+    def upload(self, fileobj: BinaryIO, filename: str, content_type: Optional[str] = None) -> str:
+        """
+        Sube una imagen a Cloudinary y retorna la URL. El archivo se envía
+        por bloques, sin cargarlo completo en memoria.
+        """
+        try:
+            result = cloudinary.uploader.upload_large(
+                fileobj,
+                resource_type="image",
+                chunk_size=CLOUDINARY_CHUNK_SIZE,
+                filename=filename
+            )
+            return result["secure_url"]
+        except Exception as e:
+            raise StorageError(f"Error al subir imagen a Cloudinary: {str(e)}")
+
+    def delete(self, url: str) -> bool:
+        """
+        Elimina una imagen de Cloudinary a partir de su URL
+        """
+        if es_derivada(url):
+            return True
+        try:
+            result = cloudinary.uploader.destroy(public_id_from_url(url))
+            return result["result"] == "ok"
+        except Exception as e:
+            raise StorageError(f"Error al eliminar imagen de Cloudinary: {str(e)}")
+
+
+    def variants(self, url: str, fileobj: BinaryIO) -> List[dict]:
+        """
+        Cloudinary genera las versiones reducidas a partir de la URL (y las
+        cachea en su CDN), así que no hace falta procesar ni subir nada
+        """
+        return [
+            {
+                "ancho": ancho,
+                "formato": formato,
+                "url": url_transformada(url, f"w_{ancho},c_limit,f_{'jpg' if formato == 'jpeg' else formato},q_auto"),
+            }
+            for ancho in sorted(IMAGE_WIDTHS)
+            for formato in FORMATOS_VARIANTES
+        ]
+
+    def thumbnail(self, url: str) -> Optional[str]:
+        """
+        Pide a Cloudinary que genere la transformación de la miniatura
+        (eager), así la primera visita no espera a que se cree
+        """
+        ancho, alto = THUMBNAIL_SIZE
+        try:
+            result = cloudinary.uploader.explicit(
+                public_id_from_url(url),
+                type="upload",
+                eager=[{"width": ancho, "height": alto, "crop": "fill"}]
+            )
+            return result["eager"][0]["secure_url"]
+        except Exception as e:
+            raise StorageError(f"Error al generar miniatura en Cloudinary: {str(e)}")
@@ -0,0 +1,71 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Iterable, Optional, Tuple
+from fastapi import Request, Response
+
+def validadores(filas: Iterable) -> Tuple[str, Optional[datetime]]:
+    """
+    ETag y Last-Modified de un recurso o una página, calculados a partir de
+    (id, version, updated_at) de cada fila. Sirven tanto objetos del ORM
+    como filas de una consulta de solo esas columnas.
+    """
+    digest = hashlib.sha1()
+    ultima = None
+    for fila in filas:
+        digest.update(f"{fila.id}:{fila.version},".encode())
+        updated_at = fila.updated_at
+        if updated_at is not None:
+            if updated_at.tzinfo is None:
+                updated_at = updated_at.replace(tzinfo=timezone.utc)
+            if ultima is None or updated_at > ultima:
+                ultima = updated_at
+    return f'"{digest.hexdigest()[:20]}"', ultima
+
+def _headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+def etag_coincide(if_none_match: str, etag: str) -> bool:
+    # Comparación débil, como exige If-None-Match
+    etiquetas = [e.strip() for e in if_none_match.split(",")]
+    return "*" in etiquetas or any(e.removeprefix("W/") == etag.removeprefix("W/") for e in etiquetas)
+
+def no_modificado(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evalúa If-None-Match (con prioridad) o If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_coincide(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            fecha = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= fecha
+    return False
+
+def verificar_no_modificado(request: Request, cargar_claves: Callable[[], Iterable]) -> Optional[Response]:
+    """
+    Si el pedido es condicional, ejecuta solo la consulta liviana de claves
+    (id, version, updated_at) y retorna un 304 cuando el cliente ya tiene
+    la versión actual, sin cargar los objetos completos. Sin filas no hay
+    304: el handler responde (404 en un detalle, lista vacía en un listado),
+    así If-None-Match: * no coincide con un recurso que no existe.
+    """
+    if "if-none-match" not in request.headers and "if-modified-since" not in request.headers:
+        return None
+    claves = list(cargar_claves())
+    if not claves:
+        return None
+    etag, last_modified = validadores(claves)
+    if no_modificado(request, etag, last_modified):
+        return Response(status_code=304, headers=_headers(etag, last_modified))
+    return None
+
+def poner_validadores(response: Response, filas: Iterable):
+    """Agrega ETag y Last-Modified a la respuesta completa"""
+    etag, last_modified = validadores(filas)
+    response.headers.update(_headers(etag, last_modified))
@@ -1,30 +1,160 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from dotenv import load_dotenv
+from .metrics import Histogram, register_collector
 import os
+import time
 
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+if not SQLALCHEMY_DATABASE_URL:
+    raise RuntimeError("Falta la variable de entorno DATABASE_URL (por ejemplo sqlite:///./local.db para desarrollo)")
 
 # Añadir opciones específicas de conexión
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    # Base local (benchmarks / desarrollo): la sesión se usa desde el threadpool
+    connect_args = {"check_same_thread": False}
+else:
+    connect_args = {
+        # SSL obligatorio para Nile; DB_SSLMODE=disable para un Postgres local
+        "sslmode": os.getenv("DB_SSLMODE", "require")
+    }
+
+# Pool de conexiones. Cada worker (de gunicorn o uvicorn) tiene su propio pool, así que
+# el total de conexiones abiertas puede llegar a
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW); ver benchmarks/bench_pool.py.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+# true: verifica cada conexión con un round-trip antes de entregarla.
+# false: confía en DB_POOL_RECYCLE para descartar las conexiones viejas y
+# en que SQLAlchemy invalida el pool al detectar una desconexión.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# LIFO reutiliza siempre las mismas conexiones y deja que las demás expiren
+DB_POOL_LIFO = os.getenv("DB_POOL_LIFO", "false").lower() == "true"
+
+# Tiempo de cada checkout (espera por una conexión libre, pre-ping y
+# apertura de conexiones nuevas incluidos)
+checkout_latency = Histogram()
+
+class PoolInstrumentado(QueuePool):
+    """QueuePool que registra la latencia de checkout y los timeouts"""
+
+    timeouts = 0
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            PoolInstrumentado.timeouts += 1
+            raise
+        finally:
+            checkout_latency.observe(time.perf_counter() - inicio)
+
+def _opciones_pool(url: str) -> dict:
+    if url in ("sqlite://", "sqlite:///:memory:"):
+        # SQLite en memoria usa un pool propio de una conexión por hilo
+        return {}
+    return {
+        "poolclass": PoolInstrumentado,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_use_lifo": DB_POOL_LIFO,
+    }
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    pool_pre_ping=True,  # Verificar la conexión antes de usarla
-    pool_recycle=300,    # Reciclar conexiones cada 5 minutos
-    connect_args={
-        "sslmode": "require"  # Forzar SSL para conexiones a Nile
-    }
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE,
+    connect_args=connect_args,
+    **_opciones_pool(SQLALCHEMY_DATABASE_URL)
 )
 
+def _tras_fork():
+    # Si el proceso se bifurca con el engine ya creado (por ejemplo gunicorn
+    # con preload_app), el hijo no debe reutilizar las conexiones del padre:
+    # se descartan sin cerrarlas y el hijo abre las suyas
+    engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+def pool_status() -> dict:
+    """Estado actual del pool de conexiones"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"clase": type(pool).__name__}
+    return {
+        "clase": type(pool).__name__,
+        "tamaño": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "en_uso": pool.checkedout(),
+        "libres": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "timeouts": PoolInstrumentado.timeouts,
+        "pre_ping": DB_POOL_PRE_PING,
+        "checkout_p50_ms": round(checkout_latency.quantile(0.5) * 1000, 3),
+        "checkout_p99_ms": round(checkout_latency.quantile(0.99) * 1000, 3),
+    }
+
+@register_collector
+def _pool_metrics():
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return []
+    return [
+        ("db_pool_size", "gauge", "Conexiones persistentes configuradas en el pool", pool.size()),
+        ("db_pool_max_overflow", "gauge", "Conexiones adicionales permitidas sobre el tamaño del pool", DB_MAX_OVERFLOW),
+        ("db_pool_checked_out", "gauge", "Conexiones en uso", pool.checkedout()),
+        ("db_pool_checked_in", "gauge", "Conexiones libres en el pool", pool.checkedin()),
+        ("db_pool_overflow", "gauge", "Conexiones abiertas por encima del tamaño del pool", max(pool.overflow(), 0)),
+        ("db_pool_timeouts_total", "counter", "Checkouts que agotaron DB_POOL_TIMEOUT", PoolInstrumentado.timeouts),
+        ("db_pool_checkout_seconds", "histogram", "Latencia de checkout de una conexión del pool",
+         checkout_latency.samples()),
+    ]
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# La sesión es síncrona: los handlers que la usan se declaran con `def` y no
+# con `async def`, para que FastAPI los ejecute en su threadpool y cada
+# round-trip a la base no bloquee el event loop.
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# Contador de consultas SQL (útil en tests para detectar problemas N+1)
+_contadores_activos = []
+
+@event.listens_for(engine, "before_cursor_execute")
+def _contar_consulta(conn, cursor, statement, parameters, context, executemany):
+    for contador in list(_contadores_activos):
+        contador.append(statement)
+
+@contextmanager
+def count_queries():
+    """
+    Registra todas las sentencias SQL ejecutadas por el engine dentro del bloque.
+
+    Uso:
+        with count_queries() as queries:
+            client.get("/vehiculos/")
+        assert len(queries) == 2
+    """
+    queries = []
+    _contadores_activos.append(queries)
+    try:
+        yield queries
+    finally:
+        _contadores_activos.remove(queries)
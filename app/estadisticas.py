@@ -0,0 +1,72 @@
+from collections import defaultdict
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from . import models, schemas
+
+# Clave de por_estado para los vehículos sin estado cargado
+SIN_ESTADO = "sin_estado"
+
+class _Acumulado:
+    def __init__(self):
+        self.cantidad = 0
+        self.con_precio = 0
+        self.suma = 0
+        self.minimo = None
+        self.maximo = None
+
+    def sumar(self, cantidad, con_precio, suma, minimo, maximo):
+        self.cantidad += cantidad
+        self.con_precio += con_precio
+        self.suma += suma
+        if minimo is not None and (self.minimo is None or minimo < self.minimo):
+            self.minimo = minimo
+        if maximo is not None and (self.maximo is None or maximo > self.maximo):
+            self.maximo = maximo
+
+    def precio(self) -> schemas.EstadisticasPrecio:
+        return schemas.EstadisticasPrecio(
+            minimo=self.minimo,
+            promedio=round(self.suma / self.con_precio, 2) if self.con_precio else None,
+            maximo=self.maximo
+        )
+
+def estadisticas_vehiculos(db: Session, concesionaria_id: Optional[int] = None) -> schemas.EstadisticasVehiculos:
+    """
+    Cantidades por estado, precios y desglose por marca, de todo el
+    inventario o de una concesionaria. Se leen de la tabla de agregados:
+    una fila por marca y estado, sin importar cuántos vehículos haya.
+    """
+    e = models.EstadisticaVehiculos
+    consulta = (
+        select(
+            e.marca_id, e.estado, func.sum(e.cantidad), func.sum(e.con_precio),
+            func.sum(e.suma_precio), func.min(e.precio_min), func.max(e.precio_max)
+        )
+        .group_by(e.marca_id, e.estado)
+    )
+    if concesionaria_id is not None:
+        consulta = consulta.where(e.concesionaria_id == concesionaria_id)
+
+    total = _Acumulado()
+    por_estado = defaultdict(int)
+    por_marca = defaultdict(_Acumulado)
+    for marca_id, estado, *valores in db.execute(consulta):
+        total.sumar(*valores)
+        por_estado[estado or SIN_ESTADO] += valores[0]
+        por_marca[marca_id].sumar(*valores)
+
+    nombres = dict(
+        db.query(models.Marca.id, models.Marca.nombre).filter(models.Marca.id.in_([m for m in por_marca if m is not None]))
+    ) if por_marca else {}
+    return schemas.EstadisticasVehiculos(
+        cantidad=total.cantidad,
+        por_estado=dict(por_estado),
+        precio=total.precio(),
+        por_marca=[
+            schemas.EstadisticasMarca(
+                marca_id=marca_id, marca=nombres.get(marca_id), cantidad=acumulado.cantidad, precio=acumulado.precio()
+            )
+            for marca_id, acumulado in sorted(por_marca.items(), key=lambda item: -item[1].cantidad)
+        ]
+    )
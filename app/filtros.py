@@ -0,0 +1,64 @@
+import sys
+from fastapi import HTTPException
+from sqlalchemy import desc, func
+from . import models, schemas
+
+def _ordenes(v):
+    # Claves de ordenamiento estables para los listados de vehículos (la
+    # última columna es única). Cada una tiene un índice que la respalda en
+    # models.py, tanto en Vehiculo como en VehiculoResumen.
+    return {
+        "id": [v.id],
+        "precio": [v.precio, v.id],
+        "-precio": [desc(v.precio), desc(v.id)],
+        "anio": [v.anio, v.id],
+        "-anio": [desc(v.anio), desc(v.id)],
+    }
+
+ORDENES_VEHICULOS = _ordenes(models.Vehiculo)
+ORDENES_RESUMEN = _ordenes(models.VehiculoResumen)
+
+def columnas_orden(orden: str, ordenes: dict = ORDENES_VEHICULOS):
+    if orden not in ordenes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Orden inválido. Opciones: {', '.join(ordenes)}"
+        )
+    return ordenes[orden]
+
+def filtrar_vehiculos(query, filtros: schemas.FiltrosVehiculo, v=models.Vehiculo):
+    """
+    Aplica los filtros del listado sobre Vehiculo (o VehiculoResumen, que
+    tiene las mismas columnas). Las combinaciones habituales de la tienda
+    (concesionaria + estado + precio, marca + año, prefijo de modelo) usan
+    los índices compuestos declarados en models.py.
+    """
+    if filtros.concesionaria_id is not None:
+        query = query.filter(v.concesionaria_id == filtros.concesionaria_id)
+    if filtros.marca_id is not None:
+        query = query.filter(v.marca_id == filtros.marca_id)
+    if filtros.estado:
+        query = query.filter(v.estado == filtros.estado)
+    if filtros.anio_min is not None:
+        query = query.filter(v.anio >= filtros.anio_min)
+    if filtros.anio_max is not None:
+        query = query.filter(v.anio <= filtros.anio_max)
+    if filtros.precio_min is not None:
+        query = query.filter(v.precio >= filtros.precio_min)
+    if filtros.precio_max is not None:
+        query = query.filter(v.precio <= filtros.precio_max)
+    if filtros.color:
+        query = query.filter(func.lower(v.color) == filtros.color.lower())
+    if filtros.modelo:
+        # Búsqueda por prefijo sin distinguir mayúsculas. El rango permite usar
+        # el índice sobre lower(modelo) en cualquier motor; el LIKE descarta
+        # los valores del rango que no empiezan con el prefijo.
+        prefijo = filtros.modelo.lower()
+        patron = prefijo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        modelo = func.lower(v.modelo)
+        query = query.filter(modelo >= prefijo, modelo.like(f"{patron}%", escape="\\"))
+        # Cota superior del rango; no existe si el prefijo termina en el
+        # último carácter de Unicode
+        if ord(prefijo[-1]) < sys.maxunicode:
+            query = query.filter(modelo < prefijo[:-1] + chr(ord(prefijo[-1]) + 1))
+    return query
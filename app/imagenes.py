@@ -0,0 +1,82 @@
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+
+# Anchos (en píxeles) de las versiones reducidas de cada imagen. Nunca se
+# agranda: los anchos mayores que el original se omiten.
+IMAGE_WIDTHS = tuple(int(a) for a in os.getenv("IMAGE_WIDTHS", "320,640,1280").split(","))
+# Cada ancho se genera en JPEG y en WebP (más liviano, para los navegadores que lo aceptan)
+FORMATOS_VARIANTES = ("jpeg", "webp")
+CALIDAD = {"jpeg": 80, "webp": 75}
+# Procesos que redimensionan imágenes (trabajo de CPU, fuera del GIL de la API)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+def redimensionar(datos: bytes, anchos=IMAGE_WIDTHS, formatos=FORMATOS_VARIANTES) -> List[Tuple[int, str, bytes]]:
+    """
+    Genera las versiones reducidas de una imagen: (ancho, formato, bytes).
+    Corre en los procesos del pool, por eso solo recibe y retorna bytes.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(datos)) as original:
+        # Respeta la orientación EXIF de las fotos de celulares
+        imagen = ImageOps.exif_transpose(original).convert("RGB")
+    variantes = []
+    for ancho in sorted(anchos):
+        if ancho >= imagen.width:
+            continue
+        alto = round(imagen.height * ancho / imagen.width)
+        reducida = imagen.resize((ancho, alto), Image.LANCZOS)
+        for formato in formatos:
+            salida = io.BytesIO()
+            reducida.save(salida, formato.upper(), quality=CALIDAD[formato], optimize=True)
+            variantes.append((ancho, formato, salida.getvalue()))
+    return variantes
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def generar_variantes(datos: bytes) -> List[Tuple[int, str, bytes]]:
+    """Redimensiona en el pool de procesos (se crea con el primer uso)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: los procesos no heredan hilos ni conexiones abiertas de la API
+            _pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        pool = _pool
+    try:
+        return pool.submit(redimensionar, datos).result()
+    except BrokenProcessPool:
+        # Un proceso murió (por ejemplo, sin memoria con una imagen enorme):
+        # el pool ya no sirve y se crea otro en el próximo uso. Si otro hilo
+        # ya lo reemplazó, el pool nuevo se deja como está.
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+
+def cerrar_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def elegir_variante(url: str, variantes: List[dict], ancho: Optional[int], webp: bool) -> str:
+    """
+    URL de la versión más chica que cubre el ancho pedido, en WebP si el
+    cliente lo acepta. Sin variantes suficientes, la imagen original.
+    """
+    if not ancho:
+        return url
+    formato = "webp" if webp else "jpeg"
+    candidatas = sorted(
+        (v for v in variantes if v["formato"] == formato and v["ancho"] >= ancho),
+        key=lambda v: v["ancho"]
+    )
+    return candidatas[0]["url"] if candidatas else url
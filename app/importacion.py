@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from pydantic import ValidationError
+from . import schemas
+
+FORMATOS = ("csv", "ndjson")
+
+# Columnas del archivo de importación/exportación
+COLUMNAS = ["id"] + list(schemas.VehiculoCreate.model_fields)
+
+def detectar_formato(filename: str, content_type: str) -> str:
+    nombre = (filename or "").lower()
+    tipo = (content_type or "").lower()
+    if nombre.endswith((".ndjson", ".jsonl")) or "ndjson" in tipo or "jsonl" in tipo:
+        return "ndjson"
+    return "csv"
+
+def iter_filas(fileobj, formato: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Lee el archivo fila por fila sin cargarlo completo en memoria.
+    Retorna (número de fila, dict) o (número de fila, excepción) si la
+    línea no se pudo interpretar.
+    """
+    texto = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if formato == "csv":
+        # La fila 1 es la cabecera
+        for numero, fila in enumerate(csv.DictReader(texto), start=2):
+            yield numero, fila
+    else:
+        for numero, linea in enumerate(texto, start=1):
+            if not linea.strip():
+                continue
+            try:
+                yield numero, json.loads(linea)
+            except ValueError as e:
+                yield numero, e
+
+def en_bloques(iterable: Iterable, tamaño: int) -> Iterator[List]:
+    iterador = iter(iterable)
+    while True:
+        bloque = list(islice(iterador, tamaño))
+        if not bloque:
+            return
+        yield bloque
+
+def validar_fila(fila: Any, concesionaria_id: int) -> schemas.VehiculoCreate:
+    """
+    Valida una fila contra VehiculoCreate. Las celdas vacías se ignoran y,
+    si la fila no indica concesionaria, se usa la del usuario.
+    """
+    if isinstance(fila, Exception):
+        raise ValueError(f"Línea inválida: {fila}")
+    if not isinstance(fila, dict):
+        raise ValueError("Cada fila debe ser un objeto")
+    datos: Dict[str, Any] = {
+        k: v for k, v in fila.items()
+        if k in schemas.VehiculoCreate.model_fields and v not in (None, "")
+    }
+    datos.setdefault("concesionaria_id", concesionaria_id)
+    return schemas.VehiculoCreate(**datos)
+
+def describir_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors()
+        )
+    return str(error)
+
+def a_csv(filas: Iterable[Any], cabecera: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if cabecera:
+        writer.writerow(COLUMNAS)
+    writer.writerows(filas)
+    return buffer.getvalue()
+
+def a_ndjson(filas: Iterable[Any]) -> str:
+    return "".join(
+        json.dumps(dict(zip(COLUMNAS, fila)), ensure_ascii=False) + "\n" for fila in filas
+    )
@@ -0,0 +1,138 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# Nivel general y niveles por logger, por ejemplo
+# LOG_LEVELS="app.routers.vehiculos=DEBUG,sqlalchemy.engine=WARNING"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# json (por defecto) o text para leerlos en la consola durante el desarrollo
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+# Cabecera con la que se recibe y devuelve el id de cada petición
+REQUEST_ID_HEADER = "X-Request-ID"
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Atributos propios de LogRecord; el resto son campos agregados con `extra`
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro, con los campos de `extra` al mismo nivel"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            datos["request_id"] = record.request_id
+        for clave, valor in record.__dict__.items():
+            if clave not in _ATRIBUTOS_RECORD:
+                datos[clave] = valor
+        if record.exc_text:
+            datos["exc"] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+class _QueueHandler(QueueHandler):
+    """
+    Encola el registro con el id de la petición. El formateo y la escritura
+    los hace el QueueListener en su propio hilo; aquí solo se resuelve el
+    mensaje y, si hay una excepción, su traceback.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.request_id = request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+_listener: Optional[QueueListener] = None
+
+def configurar_logging():
+    """
+    Configura el logger raíz para que los handlers de la API solo encolen
+    registros y la escritura a stdout ocurra en un hilo aparte.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    salida = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        salida.setFormatter(JsonFormatter())
+    else:
+        salida.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+    cola = queue.SimpleQueue()
+    raiz = logging.getLogger()
+    raiz.handlers = [_QueueHandler(cola)]
+    raiz.setLevel(LOG_LEVEL)
+    for par in filter(None, (p.strip() for p in LOG_LEVELS.split(","))):
+        nombre, _, nivel = par.partition("=")
+        logging.getLogger(nombre.strip()).setLevel(nivel.strip().upper())
+
+    _listener = QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(detener_logging)
+
+def detener_logging():
+    """Escribe los registros pendientes y detiene el hilo del listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def _tras_fork():
+    # El hilo del listener no existe en el proceso hijo: se crea otro
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configurar_logging()
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+class RequestIdMiddleware:
+    """
+    Asigna a cada petición un id (el de la cabecera X-Request-ID si el cliente
+    o el proxy lo envían) que se agrega a todos sus registros y a la respuesta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recibido = dict(scope["headers"]).get(REQUEST_ID_HEADER.lower().encode())
+        valor = recibido.decode("latin-1")[:128] if recibido else uuid.uuid4().hex
+        # No se restablece al terminar: cada petición corre en su propia tarea y
+        # así el id sigue disponible para el manejador de errores 500, que
+        # corre por fuera de este middleware
+        request_id.set(valor)
+
+        async def send_con_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER.lower().encode(), valor.encode())
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_con_id)
@@ -1,20 +1,69 @@
 from fastapi import FastAPI, Request
+from anyio import to_thread
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from .routers import auth, vehiculos, marcas, concesionarias
+from fastapi.staticfiles import StaticFiles
+from .routers import auth, vehiculos, marcas, concesionarias, metricas, salud
 from .database import engine
-from . import models
+from .imagenes import cerrar_pool as cerrar_pool_imagenes
+from .logs import REQUEST_ID_HEADER, RequestIdMiddleware, configurar_logging, detener_logging
+from .pagination import NEXT_CURSOR_HEADER
+from .rate_limit import RateLimitMiddleware
+from .request_metrics import RequestMetricsMiddleware
+from .response_cache import ResponseCacheMiddleware
+from .storage import STORAGE_BACKEND, LOCAL_STORAGE_DIR, LOCAL_STORAGE_URL
+from .tareas import TAREAS_HABILITADAS, cola as cola_tareas
 from sqlalchemy.exc import OperationalError
+from contextlib import asynccontextmanager
+import logging
+import os
 
-# Crear las tablas en la base de datos
-models.Base.metadata.create_all(bind=engine)
+# Logs estructurados en JSON, escritos desde un hilo aparte
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+# El esquema se administra con migraciones (alembic upgrade head) fuera del
+# arranque: importar la aplicación no hace ninguna consulta ni DDL, y la
+# primera conexión se abre con la primera petición que usa la base.
+
+# Los handlers con acceso a la base corren en el threadpool de AnyIO;
+# su tamaño limita cuántas peticiones concurrentes pueden esperar a la base
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Arranque y parada de cada worker. Todo lo que abre conexiones o hilos
+    se crea aquí, después del fork, y se libera al salir. uvicorn ejecuta
+    la parada recién cuando cerró el socket y terminaron las peticiones en
+    curso.
+    """
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # Cola de tareas en segundo plano (borrado de imágenes, miniaturas, limpieza)
+    if TAREAS_HABILITADAS:
+        await cola_tareas.iniciar()
+    yield
+
+    await cola_tareas.detener()
+    cerrar_pool_imagenes()
+    engine.dispose()
+    detener_logging()
 
 app = FastAPI(
     title="API de Concesionarias",
     description="API para gestionar concesionarias de vehículos",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Caché de respuestas de las lecturas públicas del catálogo
+app.add_middleware(ResponseCacheMiddleware)
+
+# Límite de peticiones por IP y por usuario (429 con Retry-After). Va por
+# dentro de CORS para que el navegador pueda leer la respuesta, y por fuera
+# de la caché para que también cuenten las respuestas cacheadas.
+app.add_middleware(RateLimitMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,17 +71,33 @@ app.add_middleware(
     allow_credentials=False,  # Cambiar de True a False
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, REQUEST_ID_HEADER],
 )
 
+# Métricas de latencia, códigos de estado y consultas por ruta (/metrics).
+# Se agrega al final para que sea el más externo y mida toda la petición.
+app.add_middleware(RequestMetricsMiddleware)
+
+# Id de correlación de cada petición para los logs (cabecera X-Request-ID)
+app.add_middleware(RequestIdMiddleware)
+
 # Incluir los routers
 app.include_router(auth.router)
 app.include_router(vehiculos.router)
 app.include_router(marcas.router)
 app.include_router(concesionarias.router)
+app.include_router(metricas.router)
+app.include_router(salud.router)
+
+# Con almacenamiento local las imágenes se sirven desde la propia API
+if STORAGE_BACKEND == "local":
+    os.makedirs(LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount(LOCAL_STORAGE_URL, StaticFiles(directory=LOCAL_STORAGE_DIR), name="media")
 
 # Manejador global para errores de base de datos
 @app.exception_handler(OperationalError)
 async def db_exception_handler(request: Request, exc: OperationalError):
+    logger.error("Error de conexión con la base de datos", exc_info=exc, extra={"path": request.url.path})
     return JSONResponse(
         status_code=503,
         content={"detail": "Servicio temporalmente no disponible. Intenta más tarde."},
@@ -41,6 +106,7 @@ async def db_exception_handler(request: Request, exc: OperationalError):
 # Manejador global para errores generales
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
+    logger.error("Error no controlado", exc_info=exc, extra={"path": request.url.path})
     return JSONResponse(
         status_code=500,
         content={"detail": "Error interno del servidor."},
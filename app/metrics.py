@@ -0,0 +1,90 @@
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, Union
+
+# Una muestra es (sufijo del nombre, etiquetas, valor), por ejemplo
+# ("_bucket", {"le": "0.1"}, 42) para una cubeta de un histograma
+Sample = Tuple[str, Dict[str, str], float]
+
+# Cada colector devuelve tuplas (nombre, tipo, ayuda, valor) que se exponen
+# en /metrics con el formato de texto de Prometheus. El valor es un número o
+# una lista de muestras (métricas con etiquetas e histogramas).
+Metric = Tuple[str, str, str, Union[float, List[Sample]]]
+
+_collectors: List[Callable[[], Iterable[Metric]]] = []
+
+# Cubetas por defecto para latencias, en segundos
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Histograma acumulativo al estilo Prometheus, seguro entre hilos"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect_left(self.buckets, value)] += 1
+            self._sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def quantile(self, q: float) -> float:
+        """Cota superior de la cubeta que contiene el cuantil q (aproximado)"""
+        with self._lock:
+            counts = list(self._counts)
+        total = sum(counts)
+        if not total:
+            return 0.0
+        acumulado = 0
+        for limite, cantidad in zip(self.buckets + (float("inf"),), counts):
+            acumulado += cantidad
+            if acumulado >= q * total:
+                return limite
+        return float("inf")
+
+    def samples(self, labels: Dict[str, str] = None) -> List[Sample]:
+        labels = labels or {}
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+        samples = []
+        acumulado = 0
+        for limite, cantidad in zip(self.buckets, counts):
+            acumulado += cantidad
+            samples.append(("_bucket", {**labels, "le": repr(limite)}, acumulado))
+        acumulado += counts[-1]
+        samples.append(("_bucket", {**labels, "le": "+Inf"}, acumulado))
+        samples.append(("_sum", labels, round(total_sum, 6)))
+        samples.append(("_count", labels, acumulado))
+        return samples
+
+def register_collector(collector: Callable[[], Iterable[Metric]]):
+    _collectors.append(collector)
+    return collector
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in labels.items()) + "}"
+
+def render_metrics() -> str:
+    lines = []
+    for collector in _collectors:
+        for name, kind, help_text, value in collector():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if isinstance(value, list):
+                for sufijo, labels, sample in value:
+                    lines.append(f"{name}{sufijo}{_labels(labels)} {sample}")
+            else:
+                lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -1,8 +1,33 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from datetime import datetime, timezone
+from sqlalchemy import JSON, BigInteger, Column, DateTime, Integer, String, Text, ForeignKey, Index, and_, case, delete, event, func, insert, inspect, literal_column, or_, select, update
+from sqlalchemy.dialects import postgresql  # registra to_tsvector/plainto_tsquery para func
 from sqlalchemy.orm import relationship
 from .database import Base
 
-class Concesionaria(Base):
+# Configuración de texto de Postgres usada por la búsqueda de vehículos
+SEARCH_CONFIG = "spanish"
+
+def search_vector(columna):
+    """to_tsvector sobre la columna, idéntico a la expresión del índice GIN"""
+    return func.to_tsvector(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), columna)
+
+def ahora() -> datetime:
+    return datetime.now(timezone.utc)
+
+class VersionadoMixin:
+    """
+    Versión y fecha de la última escritura, usadas como validadores HTTP
+    (ETag / Last-Modified). Se actualizan en cada UPDATE por el ORM.
+    """
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=ahora, server_default=func.now())
+
+@event.listens_for(VersionadoMixin, "before_update", propagate=True)
+def _incrementar_version(mapper, connection, target):
+    target.version = (target.version or 0) + 1
+    target.updated_at = ahora()
+
+class Concesionaria(VersionadoMixin, Base):
     __tablename__ = "concesionarias"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -24,7 +49,7 @@ class Usuario(Base):
 
     concesionaria = relationship("Concesionaria", back_populates="usuarios")
 
-class Marca(Base):
+class Marca(VersionadoMixin, Base):
     __tablename__ = "marcas"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -32,7 +57,7 @@ class Marca(Base):
 
     vehiculos = relationship("Vehiculo", back_populates="marca")
 
-class Vehiculo(Base):
+class Vehiculo(VersionadoMixin, Base):
     __tablename__ = "vehiculos"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -44,16 +69,347 @@ class Vehiculo(Base):
     descripcion = Column(Text)
     marca_id = Column(Integer, ForeignKey("marcas.id"))
     concesionaria_id = Column(Integer, ForeignKey("concesionarias.id"))
+    # Modelo, marca y descripción concatenados; se mantiene al crear y
+    # editar y es la base del índice de búsqueda de texto completo
+    texto_busqueda = Column(Text)
 
     marca = relationship("Marca", back_populates="vehiculos")
     concesionaria = relationship("Concesionaria", back_populates="vehiculos")
     imagenes = relationship("Imagen", back_populates="vehiculo")
 
+    __table_args__ = (
+        # Ordenamiento y paginación por cursor por precio y por año
+        Index("ix_vehiculos_precio_id", "precio", "id"),
+        Index("ix_vehiculos_anio_id", "anio", "id"),
+        # Filtros del listado
+        Index("ix_vehiculos_estado_precio_id", "estado", "precio", "id"),
+        Index("ix_vehiculos_concesionaria_estado_precio", "concesionaria_id", "estado", "precio"),
+        Index("ix_vehiculos_marca_anio", "marca_id", "anio"),
+        # Búsqueda por prefijo de modelo sin distinguir mayúsculas
+        Index("ix_vehiculos_modelo_lower", func.lower(modelo)),
+        # Búsqueda de texto completo (solo Postgres)
+        Index(
+            "ix_vehiculos_texto_busqueda",
+            search_vector(texto_busqueda),
+            postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+    )
+
+def componer_texto_busqueda(modelo, marca, descripcion) -> str:
+    return " ".join([modelo or "", marca or "", descripcion or ""])
+
+@event.listens_for(Vehiculo, "before_insert")
+@event.listens_for(Vehiculo, "before_update")
+def _actualizar_texto_busqueda(mapper, connection, target):
+    estado = inspect(target)
+    if estado.persistent and not any(
+        estado.attrs[campo].history.has_changes() for campo in ("modelo", "descripcion", "marca_id")
+    ):
+        return
+    marca = connection.scalar(select(Marca.nombre).where(Marca.id == target.marca_id))
+    target.texto_busqueda = componer_texto_busqueda(target.modelo, marca, target.descripcion)
+
 class Imagen(Base):
     __tablename__ = "imagenes"
 
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String)
+    # Versión reducida para las tarjetas; la genera una tarea en segundo plano
+    miniatura_url = Column(String)
+    # Versiones reducidas: lista de {"ancho", "formato", "url"} (ver app/imagenes.py)
+    variantes = Column(JSON, nullable=False, default=list, server_default="[]")
     vehiculo_id = Column(Integer, ForeignKey("vehiculos.id"))
 
-    vehiculo = relationship("Vehiculo", back_populates="imagenes") 
\ No newline at end of file
+    vehiculo = relationship("Vehiculo", back_populates="imagenes")
+
+    __table_args__ = (
+        # Carga de las imágenes de cada vehículo (selectinload) y primera
+        # imagen como miniatura del resumen
+        Index("ix_imagenes_vehiculo_id", "vehiculo_id", "id"),
+    )
+
+    def urls(self):
+        """Archivos de la imagen en el almacenamiento"""
+        return [url for url in (self.url, self.miniatura_url, *(v["url"] for v in self.variantes or [])) if url]
+
+class VehiculoResumen(Base):
+    """
+    Proyección desnormalizada de los vehículos para las tarjetas del listado:
+    incluye los nombres de marca y concesionaria y la primera imagen, así una
+    página se lee con una sola consulta sin joins. Se mantiene desde los
+    eventos de Vehiculo, Imagen, Marca y Concesionaria.
+    """
+    __tablename__ = "vehiculos_resumen"
+
+    id = Column(Integer, ForeignKey("vehiculos.id"), primary_key=True, autoincrement=False)
+    modelo = Column(String)
+    anio = Column(Integer)
+    color = Column(String)
+    estado = Column(String)
+    precio = Column(Integer)
+    marca_id = Column(Integer)
+    concesionaria_id = Column(Integer)
+    marca = Column(String)
+    concesionaria = Column(String)
+    miniatura_url = Column(String)
+
+    __table_args__ = (
+        # Mismos órdenes y filtros que el listado completo
+        Index("ix_vehiculos_resumen_precio_id", "precio", "id"),
+        Index("ix_vehiculos_resumen_anio_id", "anio", "id"),
+        Index("ix_vehiculos_resumen_estado_precio_id", "estado", "precio", "id"),
+        Index("ix_vehiculos_resumen_concesionaria_estado_precio", "concesionaria_id", "estado", "precio"),
+        Index("ix_vehiculos_resumen_marca_anio", "marca_id", "anio"),
+        Index("ix_vehiculos_resumen_modelo_lower", func.lower(modelo)),
+    )
+
+# Columnas de Vehiculo copiadas a la proyección
+CAMPOS_RESUMEN_VEHICULO = ("modelo", "anio", "color", "estado", "precio", "marca_id", "concesionaria_id")
+
+def _miniatura(vehiculo_id):
+    return (
+        select(func.coalesce(Imagen.miniatura_url, Imagen.url))
+        .where(Imagen.vehiculo_id == vehiculo_id)
+        .order_by(Imagen.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+
+def _insertar_resumen(filtro=None):
+    v = Vehiculo
+    consulta = (
+        select(
+            v.id, *[getattr(v, campo) for campo in CAMPOS_RESUMEN_VEHICULO],
+            Marca.nombre, Concesionaria.nombre, _miniatura(v.id)
+        )
+        .outerjoin(Marca, Marca.id == v.marca_id)
+        .outerjoin(Concesionaria, Concesionaria.id == v.concesionaria_id)
+    )
+    if filtro is not None:
+        consulta = consulta.where(filtro)
+    columnas = ["id", *CAMPOS_RESUMEN_VEHICULO, "marca", "concesionaria", "miniatura_url"]
+    return insert(VehiculoResumen).from_select(columnas, consulta)
+
+def refrescar_resumen(connection, vehiculo_ids):
+    """Vuelve a calcular la proyección de los vehículos indicados"""
+    vehiculo_ids = list(vehiculo_ids)
+    if not vehiculo_ids:
+        return
+    connection.execute(delete(VehiculoResumen).where(VehiculoResumen.id.in_(vehiculo_ids)))
+    connection.execute(_insertar_resumen(Vehiculo.id.in_(vehiculo_ids)))
+
+def reconstruir_resumen(connection):
+    """Recalcula la proyección completa a partir de las tablas de origen"""
+    connection.execute(delete(VehiculoResumen))
+    connection.execute(_insertar_resumen())
+
+def _cambio(target, *campos) -> bool:
+    estado = inspect(target)
+    return any(estado.attrs[campo].history.has_changes() for campo in campos)
+
+@event.listens_for(Vehiculo, "after_insert")
+def _resumen_vehiculo_insertado(mapper, connection, target):
+    refrescar_resumen(connection, [target.id])
+
+@event.listens_for(Vehiculo, "after_update")
+def _resumen_vehiculo_actualizado(mapper, connection, target):
+    # Los "touch" de updated_at por cambios de imágenes no tocan la proyección
+    if _cambio(target, *CAMPOS_RESUMEN_VEHICULO):
+        refrescar_resumen(connection, [target.id])
+
+@event.listens_for(Vehiculo, "before_delete")
+def _resumen_vehiculo_eliminado(mapper, connection, target):
+    connection.execute(delete(VehiculoResumen).where(VehiculoResumen.id == target.id))
+
+def _actualizar_miniatura(connection, vehiculo_id):
+    if vehiculo_id is not None:
+        connection.execute(
+            update(VehiculoResumen)
+            .where(VehiculoResumen.id == vehiculo_id)
+            .values(miniatura_url=_miniatura(VehiculoResumen.id))
+        )
+
+@event.listens_for(Imagen, "after_insert")
+@event.listens_for(Imagen, "after_delete")
+def _resumen_imagen(mapper, connection, target):
+    _actualizar_miniatura(connection, target.vehiculo_id)
+
+@event.listens_for(Imagen, "after_update")
+def _resumen_imagen_actualizada(mapper, connection, target):
+    historial = inspect(target).attrs.vehiculo_id.history
+    for vehiculo_id in {target.vehiculo_id, *historial.deleted}:
+        _actualizar_miniatura(connection, vehiculo_id)
+
+@event.listens_for(Marca, "after_update")
+def _resumen_marca(mapper, connection, target):
+    if _cambio(target, "nombre"):
+        connection.execute(
+            update(VehiculoResumen).where(VehiculoResumen.marca_id == target.id).values(marca=target.nombre)
+        )
+
+@event.listens_for(Concesionaria, "after_update")
+def _resumen_concesionaria(mapper, connection, target):
+    if _cambio(target, "nombre"):
+        connection.execute(
+            update(VehiculoResumen)
+            .where(VehiculoResumen.concesionaria_id == target.id)
+            .values(concesionaria=target.nombre)
+        )
+
+class EstadisticaVehiculos(Base):
+    """
+    Agregados de los vehículos por concesionaria, marca y estado, para las
+    estadísticas de los tableros. Se mantienen de forma incremental desde
+    los eventos de Vehiculo: leerlos cuesta lo mismo sin importar cuántos
+    vehículos haya. Puede haber más de una fila por grupo (dos altas
+    concurrentes del primer vehículo de un grupo); las lecturas las suman.
+    """
+    __tablename__ = "estadisticas_vehiculos"
+
+    id = Column(Integer, primary_key=True)
+    concesionaria_id = Column(Integer)
+    marca_id = Column(Integer)
+    estado = Column(String)
+    cantidad = Column(Integer, nullable=False, default=0)
+    # Vehículos con precio cargado, suma de sus precios y extremos
+    con_precio = Column(Integer, nullable=False, default=0)
+    suma_precio = Column(BigInteger, nullable=False, default=0)
+    precio_min = Column(Integer)
+    precio_max = Column(Integer)
+
+    __table_args__ = (
+        Index("ix_estadisticas_vehiculos_grupo", "concesionaria_id", "marca_id", "estado"),
+    )
+
+# Columnas de Vehiculo que definen el grupo de las estadísticas
+CAMPOS_GRUPO_ESTADISTICAS = ("concesionaria_id", "marca_id", "estado")
+
+def _mismo_grupo(columnas, grupo):
+    # IS NULL solo donde hace falta: "=" sí puede usar los índices
+    return and_(*[columna.is_(None) if valor is None else columna == valor for columna, valor in zip(columnas, grupo)])
+
+def _columnas_grupo(tabla):
+    return [getattr(tabla, campo) for campo in CAMPOS_GRUPO_ESTADISTICAS]
+
+def _sumar_estadistica(connection, grupo, cantidad, con_precio, suma_precio, precio_min, precio_max):
+    """Suma vehículos a un grupo (creándolo si no existe)"""
+    e = EstadisticaVehiculos
+    valores = {"cantidad": e.cantidad + cantidad, "con_precio": e.con_precio + con_precio, "suma_precio": e.suma_precio + suma_precio}
+    if precio_min is not None:
+        valores["precio_min"] = case((or_(e.precio_min.is_(None), e.precio_min > precio_min), precio_min), else_=e.precio_min)
+        valores["precio_max"] = case((or_(e.precio_max.is_(None), e.precio_max < precio_max), precio_max), else_=e.precio_max)
+    fila = select(func.min(e.id)).where(_mismo_grupo(_columnas_grupo(e), grupo)).scalar_subquery()
+    resultado = connection.execute(update(e).where(e.id == fila).values(**valores))
+    if resultado.rowcount == 0:
+        connection.execute(insert(e).values(
+            **dict(zip(CAMPOS_GRUPO_ESTADISTICAS, grupo)),
+            cantidad=cantidad, con_precio=con_precio, suma_precio=suma_precio,
+            precio_min=precio_min, precio_max=precio_max
+        ))
+
+def _restar_estadistica(connection, grupo, precio):
+    """Resta un vehículo de su grupo; los extremos se recalculan si era uno de ellos"""
+    e = EstadisticaVehiculos
+    filtro = _mismo_grupo(_columnas_grupo(e), grupo)
+    fila = connection.execute(
+        select(e.id, e.precio_min, e.precio_max).where(filtro).order_by(e.cantidad.desc()).limit(1)
+    ).first()
+    if fila is None:
+        return
+    valores = {"cantidad": e.cantidad - 1}
+    if precio is not None:
+        valores.update(con_precio=e.con_precio - 1, suma_precio=e.suma_precio - precio)
+    connection.execute(update(e).where(e.id == fila.id).values(**valores))
+    connection.execute(delete(e).where(filtro, e.cantidad <= 0))
+    if precio is not None and precio in (fila.precio_min, fila.precio_max):
+        # Consulta acotada al grupo (índice por concesionaria, estado y precio)
+        minimo, maximo = connection.execute(
+            select(func.min(Vehiculo.precio), func.max(Vehiculo.precio))
+            .where(_mismo_grupo(_columnas_grupo(Vehiculo), grupo))
+        ).one()
+        connection.execute(update(e).where(filtro).values(precio_min=minimo, precio_max=maximo))
+
+def _consulta_estadisticas(filtro=None):
+    v = Vehiculo
+    consulta = select(
+        *_columnas_grupo(v),
+        func.count(),
+        func.count(v.precio),
+        func.coalesce(func.sum(v.precio), 0),
+        func.min(v.precio),
+        func.max(v.precio),
+    ).group_by(*_columnas_grupo(v))
+    if filtro is not None:
+        consulta = consulta.where(filtro)
+    return consulta
+
+def sumar_estadisticas(connection, vehiculo_ids):
+    """Agrega a las estadísticas vehículos recién insertados (p. ej. por la importación)"""
+    vehiculo_ids = list(vehiculo_ids)
+    if not vehiculo_ids:
+        return
+    for *grupo, cantidad, con_precio, suma, minimo, maximo in connection.execute(
+        _consulta_estadisticas(Vehiculo.id.in_(vehiculo_ids))
+    ):
+        _sumar_estadistica(connection, grupo, cantidad, con_precio, suma, minimo, maximo)
+
+def reconstruir_estadisticas(connection):
+    """Recalcula todas las estadísticas a partir de la tabla de vehículos"""
+    connection.execute(delete(EstadisticaVehiculos))
+    connection.execute(
+        insert(EstadisticaVehiculos).from_select(
+            [*CAMPOS_GRUPO_ESTADISTICAS, "cantidad", "con_precio", "suma_precio", "precio_min", "precio_max"],
+            _consulta_estadisticas()
+        )
+    )
+
+def _grupo_anterior(target):
+    """Grupo y precio del vehículo antes de los cambios pendientes"""
+    estado = inspect(target)
+    valores = []
+    for campo in (*CAMPOS_GRUPO_ESTADISTICAS, "precio"):
+        historial = estado.attrs[campo].history
+        valores.append(historial.deleted[0] if historial.deleted else getattr(target, campo))
+    return tuple(valores[:-1]), valores[-1]
+
+@event.listens_for(Vehiculo, "after_insert")
+def _estadisticas_vehiculo_insertado(mapper, connection, target):
+    grupo = tuple(getattr(target, campo) for campo in CAMPOS_GRUPO_ESTADISTICAS)
+    precio = target.precio
+    _sumar_estadistica(connection, grupo, 1, int(precio is not None), precio or 0, precio, precio)
+
+@event.listens_for(Vehiculo, "after_update")
+def _estadisticas_vehiculo_actualizado(mapper, connection, target):
+    if _cambio(target, *CAMPOS_GRUPO_ESTADISTICAS, "precio"):
+        grupo, precio = _grupo_anterior(target)
+        _restar_estadistica(connection, grupo, precio)
+        _estadisticas_vehiculo_insertado(mapper, connection, target)
+
+@event.listens_for(Vehiculo, "after_delete")
+def _estadisticas_vehiculo_eliminado(mapper, connection, target):
+    grupo, precio = _grupo_anterior(target)
+    _restar_estadistica(connection, grupo, precio)
+
+class Tarea(Base):
+    """
+    Trabajo en segundo plano (ver app/tareas.py). Se guarda en la misma
+    transacción que lo origina, así sobrevive a reinicios del proceso.
+    """
+    __tablename__ = "tareas"
+
+    id = Column(Integer, primary_key=True)
+    tipo = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    estado = Column(String, nullable=False, default="pendiente")  # pendiente, en_curso, completada, fallida
+    intentos = Column(Integer, nullable=False, default=0)
+    max_intentos = Column(Integer, nullable=False, default=5)
+    # Cuándo puede tomarse: el próximo reintento o, en curso, el vencimiento
+    # del plazo del worker que la tomó
+    disponible_en = Column(DateTime(timezone=True), nullable=False, default=ahora)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=ahora)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=ahora)
+
+    __table_args__ = (
+        Index("ix_tareas_estado_disponible_en", "estado", "disponible_en"),
+    )
@@ -0,0 +1,111 @@
+import base64
+import json
+from typing import Any, List, Optional, Sequence
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, false, nullslast, or_
+from sqlalchemy.sql import operators
+
+# Cabecera en la que se devuelve el cursor de la página siguiente
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Tamaño máximo de página de los listados
+MAX_LIMIT = 1000
+
+def encode_cursor(orden: str, valores: Sequence[Any]) -> str:
+    """
+    Codifica la clave de ordenamiento del último elemento de una página
+    en un cursor opaco (base64 urlsafe)
+    """
+    payload = json.dumps({"o": orden, "v": list(valores)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, orden: str) -> Optional[List[Any]]:
+    """
+    Decodifica un cursor. Un cursor vacío indica la primera página.
+    """
+    if not cursor:
+        return None
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        valores = data["v"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if data.get("o") != orden:
+        raise HTTPException(status_code=400, detail="El cursor no corresponde al orden solicitado")
+    return valores
+
+def _columna_y_sentido(columna):
+    # Acepta columnas o expresiones desc(columna)
+    if getattr(columna, "modifier", None) is operators.desc_op:
+        return columna.element, True
+    return columna, False
+
+def _admite_nulos(columna) -> bool:
+    return getattr(getattr(columna, "expression", columna), "nullable", False)
+
+def _validar_valores(columnas, valores):
+    """Cada valor del cursor tiene que ser del tipo de su columna (o NULL si la columna lo admite)"""
+    if not isinstance(valores, list) or len(valores) != len(columnas):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    for columna, valor in zip(columnas, valores):
+        columna = _columna_y_sentido(columna)[0]
+        if valor is None:
+            valido = _admite_nulos(columna)
+        else:
+            tipo = columna.type.python_type
+            valido = isinstance(valor, tipo) and not (isinstance(valor, bool) and tipo is not bool)
+        if not valido:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def _ordenar(columnas):
+    # Los NULL van al final en ambos sentidos (cada motor tiene su propio
+    # default), igual que los supone _despues_de
+    return [nullslast(columna) if _admite_nulos(_columna_y_sentido(columna)[0]) else columna for columna in columnas]
+
+def _despues_de(columnas, valores):
+    # (c1, c2, ...) > (v1, v2, ...) expresado sin comparación de tuplas
+    # para que funcione igual en todos los motores y admita columnas
+    # ordenadas en forma descendente. Con NULLS LAST, después de un valor
+    # vienen los mayores (o menores) y los NULL; después de NULL, nada.
+    columnas = [_columna_y_sentido(columna) for columna in columnas]
+    condiciones = []
+    for i, (columna, descendente) in enumerate(columnas):
+        iguales = [columnas[j][0] == valores[j] for j in range(i)]  # == None es IS NULL
+        if valores[i] is None:
+            siguiente = false()
+        else:
+            siguiente = columna < valores[i] if descendente else columna > valores[i]
+            if _admite_nulos(columna):
+                siguiente = or_(siguiente, columna.is_(None))
+        condiciones.append(and_(*iguales, siguiente))
+    return or_(*condiciones)
+
+def paginar_por_cursor(
+    query,
+    orden: str,
+    columnas: Sequence,
+    cursor: str,
+    limit: int,
+    response: Response
+) -> list:
+    """
+    Pagina una consulta por keyset sobre `columnas` (la última debe ser única,
+    normalmente el id; se admiten columnas desc(...)). Cada página cuesta O(limit) con un index seek, sin
+    importar qué tan profunda sea. Si hay más resultados, el cursor de la
+    página siguiente se devuelve en la cabecera X-Next-Cursor.
+    """
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit debe ser mayor que 0")
+    valores = decode_cursor(cursor, orden)
+    if valores is not None:
+        _validar_valores(columnas, valores)
+        query = query.filter(_despues_de(columnas, valores))
+
+    items = query.order_by(*_ordenar(columnas)).limit(limit + 1).all()
+    if len(items) > limit:
+        items = items[:limit]
+        ultimo = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            orden, [getattr(ultimo, _columna_y_sentido(columna)[0].key) for columna in columnas]
+        )
+    return items
@@ -0,0 +1,363 @@
+import ipaddress
+import json
+import logging
+import math
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+from fastapi.concurrency import run_in_threadpool
+from jose import JWTError, jwt
+from . import auth
+from .metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+# Límite de peticiones con token buckets por IP y por usuario o email.
+# REDIS_URL comparte los buckets entre workers e instancias (requiere el
+# paquete `redis`); sin él cada proceso lleva su propia cuenta.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Detrás de un proxy (Render) la IP del cliente llega en X-Forwarded-For
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+# Proxies propios (IPs o rangos separados por coma) que se saltean al leer
+# X-Forwarded-For desde la derecha
+RATE_LIMIT_TRUSTED_PROXIES = [
+    ipaddress.ip_network(red.strip(), strict=False)
+    for red in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if red.strip()
+]
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Cuerpo máximo que se lee para obtener el email de /token y /usuarios/
+MAX_BODY_EMAIL = 16 * 1024
+
+@dataclass
+class Limite:
+    """`capacidad` peticiones seguidas como máximo, recargadas a razón de capacidad / periodo por segundo"""
+    capacidad: int
+    periodo: float
+
+    @property
+    def tasa(self) -> float:
+        return self.capacidad / self.periodo
+
+    @classmethod
+    def parse(cls, valor: str) -> "Limite":
+        """"10/60" son 10 peticiones cada 60 segundos"""
+        capacidad, _, periodo = valor.partition("/")
+        return cls(int(capacidad), float(periodo or 1))
+
+@dataclass
+class Regla:
+    nombre: str
+    metodos: Tuple[str, ...]
+    patron: re.Pattern
+    # Límite por cada clave: "ip", "email" (del cuerpo) o "usuario" (del token)
+    limites: Tuple[Tuple[str, Limite], ...]
+    # Claves que solo se cobran cuando la respuesta es 401 (se verifican
+    # igual antes de atender la petición)
+    solo_fallos: Tuple[str, ...] = ()
+
+def _regla(nombre: str, metodos: str, patron: str, solo_fallos: str = "", **limites: str) -> Regla:
+    """
+    Cada límite se puede cambiar con una variable de entorno, por ejemplo
+    RATE_LIMIT_TOKEN_EMAIL="5/60" para la clave email de la regla token
+    """
+    return Regla(
+        nombre,
+        tuple(metodos.split(",")),
+        re.compile(patron),
+        tuple(
+            (clave, Limite.parse(os.getenv(f"RATE_LIMIT_{nombre.upper()}_{clave.upper()}", valor)))
+            for clave, valor in limites.items()
+        ),
+        tuple(clave for clave in solo_fallos.split(",") if clave)
+    )
+
+# Se aplica la primera regla que coincide con el método y la ruta
+REGLAS: List[Regla] = [
+    # Cada intento cuesta un hash de bcrypt. El bucket del email solo se
+    # cobra en los logins fallidos: así nadie puede bloquear la cuenta de
+    # otro ni el usuario se bloquea a sí mismo con logins correctos.
+    _regla("token", "POST", r"^/token$", solo_fallos="email", ip="20/60", email="5/60"),
+    _regla("registro", "POST", r"^/usuarios/$", ip="10/3600", email="3/3600"),
+    _regla("escritura", "POST,PUT,DELETE", r"^/(?:vehiculos|marcas|concesionarias)/", usuario="60/60", ip="120/60"),
+    # Redirecciones a las imágenes (<img src>): una página del listado pide
+    # una por tarjeta, así que necesitan un límite mucho mayor que lectura
+    _regla("imagenes", "GET", r"^/vehiculos/imagenes/\d+/archivo$", ip="3000/60"),
+    # Listados públicos: frena el scraping sin afectar la navegación normal
+    _regla("lectura", "GET", r"^/(?:vehiculos|marcas|concesionarias)/", ip="300/60"),
+]
+
+class RateLimitBackend:
+    """Almacén de los buckets"""
+
+    # Los backends remotos se consultan desde el threadpool
+    blocking = False
+
+    def tomar(self, consumir: Sequence[Tuple[str, Limite]], verificar: Sequence[Tuple[str, Limite]] = ()) -> float:
+        """
+        Si todos los buckets de `consumir` y `verificar` tienen un token,
+        consume uno de cada bucket de `consumir` y retorna 0. Si no, no
+        consume nada y retorna los segundos hasta que todos tengan uno.
+        """
+        raise NotImplementedError
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Buckets en un dict del proceso. Solo se usa desde el event loop, así
+    que no necesita locks; las claves menos usadas se descartan al superar
+    RATE_LIMIT_MAX_KEYS (un bucket descartado vuelve lleno).
+    """
+
+    def __init__(self, maxsize: int = RATE_LIMIT_MAX_KEYS):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+
+    def _tokens(self, clave, limite, ahora) -> float:
+        bucket = self._buckets.get(clave)
+        if bucket is None:
+            return limite.capacidad
+        return min(limite.capacidad, bucket[0] + (ahora - bucket[1]) * limite.tasa)
+
+    def _guardar(self, clave, tokens, ahora):
+        if clave in self._buckets:
+            self._buckets.move_to_end(clave)
+        elif len(self._buckets) >= self.maxsize:
+            self._buckets.popitem(last=False)
+        self._buckets[clave] = (tokens, ahora)
+
+    def tomar(self, consumir, verificar=()):
+        ahora = time.monotonic()
+        buckets = [(clave, limite, self._tokens(clave, limite, ahora)) for clave, limite in [*consumir, *verificar]]
+        espera = max([(1 - tokens) / limite.tasa for _, limite, tokens in buckets if tokens < 1], default=0.0)
+        for i, (clave, _, tokens) in enumerate(buckets):
+            if espera == 0 and i < len(consumir):
+                tokens -= 1
+            self._guardar(clave, tokens, ahora)
+        return espera
+
+# Recarga, verificación y consumo atómicos en Redis. ARGV: cantidad de
+# claves a consumir (las primeras de KEYS) y capacidad, tasa de cada clave.
+# Cada bucket expira cuando ya estaría lleno.
+_SCRIPT_TOMAR = """
+local consumir = tonumber(ARGV[1])
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tokens = {}
+local espera = 0
+for i, clave in ipairs(KEYS) do
+    local capacidad = tonumber(ARGV[2 * i])
+    local tasa = tonumber(ARGV[2 * i + 1])
+    local bucket = redis.call('HMGET', clave, 'tokens', 'ts')
+    tokens[i] = capacidad
+    if bucket[1] then
+        tokens[i] = math.min(capacidad, tonumber(bucket[1]) + (ahora - tonumber(bucket[2])) * tasa)
+    end
+    if tokens[i] < 1 then
+        espera = math.max(espera, (1 - tokens[i]) / tasa)
+    end
+end
+for i, clave in ipairs(KEYS) do
+    local capacidad = tonumber(ARGV[2 * i])
+    local tasa = tonumber(ARGV[2 * i + 1])
+    if espera == 0 and i <= consumir then
+        tokens[i] = tokens[i] - 1
+    end
+    redis.call('HSET', clave, 'tokens', tokens[i], 'ts', ahora)
+    redis.call('EXPIRE', clave, math.ceil(capacidad / tasa) + 1)
+end
+return tostring(espera)
+"""
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets compartidos entre workers e instancias"""
+
+    blocking = True
+
+    def __init__(self, url: str):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._tomar = self._redis.register_script(_SCRIPT_TOMAR)
+
+    def tomar(self, consumir, verificar=()):
+        buckets = [*consumir, *verificar]
+        args = [len(consumir)]
+        for _, limite in buckets:
+            args += [limite.capacidad, limite.tasa]
+        return float(self._tomar(keys=[f"rl:{clave}" for clave, _ in buckets], args=args))
+
+class RateLimiter:
+
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+        self.rechazos = {}
+
+    async def tomar(self, consumir: Sequence[Tuple[str, Limite]], verificar: Sequence[Tuple[str, Limite]] = ()) -> float:
+        if not consumir and not verificar:
+            return 0.0
+        if not self.backend.blocking:
+            return self.backend.tomar(consumir, verificar)
+        try:
+            return await run_in_threadpool(self.backend.tomar, consumir, verificar)
+        except Exception:
+            # Si el almacén compartido falla se deja pasar la petición
+            logger.warning("Error al consultar el límite de peticiones", exc_info=True)
+            return 0.0
+
+rate_limiter = RateLimiter(RedisRateLimitBackend(REDIS_URL) if REDIS_URL else MemoryRateLimitBackend())
+
+def _regla_para(metodo: str, path: str) -> Optional[Regla]:
+    for regla in REGLAS:
+        if metodo in regla.metodos and regla.patron.match(path):
+            return regla
+    return None
+
+def _proxy_confiable(ip: str) -> bool:
+    try:
+        direccion = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(direccion in red for red in RATE_LIMIT_TRUSTED_PROXIES)
+
+def _ip(scope) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        reenviado = dict(scope["headers"]).get(b"x-forwarded-for")
+        if reenviado:
+            # El proxy agrega la IP que ve al final; las entradas de la
+            # izquierda las puede inventar el cliente
+            ips = [ip.strip() for ip in reenviado.decode("latin-1").split(",") if ip.strip()]
+            for ip in reversed(ips):
+                if not _proxy_confiable(ip):
+                    return ip
+            if ips:
+                return ips[0]
+    cliente = scope.get("client")
+    return cliente[0] if cliente else "desconocida"
+
+def _usuario(scope) -> Optional[str]:
+    """Email del token (verificado: un token falso no puede agotar el bucket de otro)"""
+    autorizacion = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    esquema, _, token = autorizacion.partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+def _email(scope, cuerpo: bytes) -> Optional[str]:
+    """Email del formulario de /token (username) o del JSON de /usuarios/"""
+    tipo = dict(scope["headers"]).get(b"content-type", b"").decode("latin-1")
+    try:
+        if tipo.startswith("application/x-www-form-urlencoded"):
+            valores = parse_qs(cuerpo.decode())
+            email = (valores.get("username") or valores.get("email") or [None])[0]
+        elif tipo.startswith("application/json"):
+            email = json.loads(cuerpo).get("email")
+        else:
+            return None
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+async def _leer_cuerpo(receive):
+    """Lee el cuerpo (si no supera MAX_BODY_EMAIL) y retorna los mensajes para reenviarlos"""
+    mensajes = []
+    tamaño = 0
+    while True:
+        mensaje = await receive()
+        mensajes.append(mensaje)
+        if mensaje["type"] != "http.request":
+            break
+        tamaño += len(mensaje.get("body", b""))
+        if tamaño > MAX_BODY_EMAIL or not mensaje.get("more_body", False):
+            break
+    completo = not mensajes[-1].get("more_body", False) and tamaño <= MAX_BODY_EMAIL
+    cuerpo = b"".join(m.get("body", b"") for m in mensajes) if completo else b""
+    return cuerpo, mensajes
+
+def _reenviar(mensajes, receive):
+    """receive que entrega primero los mensajes ya leídos"""
+    async def receive_reenviado():
+        return mensajes.pop(0) if mensajes else await receive()
+    return receive_reenviado
+
+class RateLimitMiddleware:
+    """
+    Aplica a cada petición los límites de la primera regla de REGLAS que
+    coincide. Si algún bucket está vacío responde 429 con Retry-After sin
+    cobrar ninguno de los otros. Es un middleware ASGI puro: el camino sin
+    rechazo es una búsqueda en un dict por clave.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        regla = _regla_para(scope["method"], scope["path"])
+        if regla is None:
+            await self.app(scope, receive, send)
+            return
+
+        claves = {"ip": _ip(scope)}
+        if any(clave == "usuario" for clave, _ in regla.limites):
+            claves["usuario"] = _usuario(scope)
+        if any(clave == "email" for clave, _ in regla.limites):
+            cuerpo, mensajes = await _leer_cuerpo(receive)
+            claves["email"] = _email(scope, cuerpo)
+            receive = _reenviar(mensajes, receive)
+
+        consumir, fallos = [], []
+        for clave, limite in regla.limites:
+            valor = claves.get(clave)
+            if valor is not None:
+                bucket = (f"{regla.nombre}:{clave}:{valor}", limite)
+                (fallos if clave in regla.solo_fallos else consumir).append(bucket)
+
+        espera = await rate_limiter.tomar(consumir, fallos)
+        if espera > 0:
+            rate_limiter.rechazos[regla.nombre] = rate_limiter.rechazos.get(regla.nombre, 0) + 1
+            await _responder_429(send, espera)
+            return
+        if not fallos:
+            await self.app(scope, receive, send)
+            return
+
+        estado = None
+
+        async def send_con_estado(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        await self.app(scope, receive, send_con_estado)
+        if estado == 401:
+            await rate_limiter.tomar(fallos)
+
+async def _responder_429(send, espera: float):
+    cuerpo = json.dumps({"detail": "Demasiadas solicitudes, intenta nuevamente más tarde"}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(cuerpo)).encode()),
+            (b"retry-after", str(math.ceil(espera)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": cuerpo})
+
+@register_collector
+def _rate_limit_metrics():
+    return [
+        ("rate_limit_rejected_total", "counter", "Peticiones rechazadas con 429, por regla",
+         [("", {"regla": regla}, valor) for regla, valor in sorted(rate_limiter.rechazos.items())]),
+    ]
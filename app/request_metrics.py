@@ -0,0 +1,148 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event
+from starlette.routing import Match
+from .database import engine
+from .metrics import Histogram, register_collector
+
+# Cubetas para la cantidad de consultas por petición (detecta N+1)
+QUERIES_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+class EstadisticasPeticion:
+    """Consultas SQL ejecutadas durante una petición"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos_db = 0.0
+
+# La petición en curso. Las tareas y el threadpool de AnyIO copian el
+# contexto, así que los handlers `def` también ven las estadísticas.
+_peticion_actual: ContextVar[Optional[EstadisticasPeticion]] = ContextVar("peticion_actual", default=None)
+
+class _PorEtiquetas:
+    """Histogramas y contadores agrupados por etiquetas"""
+
+    def __init__(self, buckets=None):
+        self._buckets = buckets
+        self._histogramas: Dict[Tuple, Histogram] = {}
+        self._contadores: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def histograma(self, etiquetas: Tuple) -> Histogram:
+        histograma = self._histogramas.get(etiquetas)
+        if histograma is None:
+            with self._lock:
+                histograma = self._histogramas.setdefault(
+                    etiquetas, Histogram(self._buckets) if self._buckets else Histogram()
+                )
+        return histograma
+
+    def sumar(self, etiquetas: Tuple, valor: float = 1):
+        with self._lock:
+            self._contadores[etiquetas] = self._contadores.get(etiquetas, 0) + valor
+
+    def muestras_histograma(self, nombres: Tuple[str, ...]):
+        return [
+            muestra
+            for etiquetas, histograma in sorted(self._histogramas.items())
+            for muestra in histograma.samples(dict(zip(nombres, etiquetas)))
+        ]
+
+    def muestras_contador(self, nombres: Tuple[str, ...]):
+        return [("", dict(zip(nombres, etiquetas)), valor) for etiquetas, valor in sorted(self._contadores.items())]
+
+_duracion = _PorEtiquetas()
+_peticiones = _PorEtiquetas()
+_consultas_por_peticion = _PorEtiquetas(QUERIES_BUCKETS)
+_tiempo_db = _PorEtiquetas()
+# Latencia de todas las consultas, dentro o fuera de una petición
+_tiempo_consultas = Histogram()
+_en_curso = 0
+
+def _ruta(scope) -> str:
+    """
+    Plantilla de la ruta (/vehiculos/{vehiculo_id}) en lugar de la URL, para
+    acotar la cantidad de series. Las respuestas servidas por la caché no
+    pasan por el router, así que en ese caso se busca la ruta aquí.
+    """
+    route = scope.get("route")
+    if route is None and "app" in scope:
+        for candidata in scope["app"].router.routes:
+            match, _ = candidata.matches(scope)
+            if match == Match.FULL:
+                route = candidata
+                break
+    return getattr(route, "path", None) or "sin_ruta"
+
+class RequestMetricsMiddleware:
+    """
+    Registra por ruta y método la latencia, el código de estado y las
+    consultas SQL de cada petición, y la cantidad de peticiones en curso.
+    Es un middleware ASGI puro para medir también las respuestas en streaming.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _en_curso
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estadisticas = EstadisticasPeticion()
+        token = _peticion_actual.set(estadisticas)
+        estado = 500
+
+        async def send_con_estado(message):
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+            await send(message)
+
+        _en_curso += 1
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_con_estado)
+        finally:
+            duracion = time.perf_counter() - inicio
+            _en_curso -= 1
+            _peticion_actual.reset(token)
+            ruta = _ruta(scope)
+            metodo = scope["method"]
+            _duracion.histograma((metodo, ruta)).observe(duracion)
+            _peticiones.sumar((metodo, ruta, str(estado)))
+            _consultas_por_peticion.histograma((metodo, ruta)).observe(estadisticas.consultas)
+            if estadisticas.consultas:
+                _tiempo_db.histograma((metodo, ruta)).observe(estadisticas.segundos_db)
+
+@event.listens_for(engine, "before_cursor_execute")
+def _inicio_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _fin_consulta(conn, cursor, statement, parameters, context, executemany):
+    duracion = time.perf_counter() - conn.info["inicio_consulta"].pop()
+    estadisticas = _peticion_actual.get()
+    if estadisticas is not None:
+        estadisticas.consultas += 1
+        estadisticas.segundos_db += duracion
+    _tiempo_consultas.observe(duracion)
+
+@register_collector
+def _request_metrics():
+    return [
+        ("http_requests_in_progress", "gauge", "Peticiones HTTP en curso", _en_curso),
+        ("http_requests_total", "counter", "Peticiones HTTP por método, ruta y código de estado",
+         _peticiones.muestras_contador(("method", "route", "status"))),
+        ("http_request_duration_seconds", "histogram", "Latencia de las peticiones HTTP por método y ruta",
+         _duracion.muestras_histograma(("method", "route"))),
+        ("http_request_db_queries", "histogram", "Consultas SQL por petición, por método y ruta",
+         _consultas_por_peticion.muestras_histograma(("method", "route"))),
+        ("http_request_db_seconds", "histogram", "Tiempo total en consultas SQL por petición, por método y ruta",
+         _tiempo_db.muestras_histograma(("method", "route"))),
+        ("db_query_duration_seconds", "histogram", "Latencia de las consultas SQL",
+         _tiempo_consultas.samples()),
+    ]
@@ -0,0 +1,217 @@
+import os
+import re
+import threading
+from typing import Optional, Tuple
+from urllib.parse import urlencode
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from starlette.middleware.base import BaseHTTPMiddleware
+from .cache import TTLCache, cache_en_memoria_habilitada
+from email.utils import parsedate_to_datetime
+from .conditional import no_modificado
+from .metrics import register_collector
+
+# Caché de respuestas de las lecturas públicas del catálogo.
+# RESPONSE_CACHE_TTL acota cuánto puede durar una entrada; REDIS_URL activa
+# un backend compartido entre workers (requiere el paquete `redis`). Sin
+# REDIS_URL y con varios workers la caché queda desactivada salvo que se
+# pida explícitamente: las invalidaciones no llegarían a los demás procesos.
+REDIS_URL = os.getenv("REDIS_URL")
+RESPONSE_CACHE_ENABLED = (
+    os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true" if REDIS_URL
+    else cache_en_memoria_habilitada("RESPONSE_CACHE_ENABLED")
+)
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+
+# Cabeceras de la respuesta que se guardan junto con el cuerpo
+HEADERS_CACHEADOS = ("content-type", "x-next-cursor", "etag", "last-modified")
+
+# Rutas cacheables y el espacio de nombres que las invalida. Los listados
+# dependen de muchas filas y comparten un espacio por recurso; cada detalle
+# tiene el suyo, así una escritura solo descarta lo que pudo cambiar.
+REGLAS = [
+    (re.compile(r"^/marcas/$"), "marcas"),
+    (re.compile(r"^/marcas/(\d+)$"), "marca:{}"),
+    (re.compile(r"^/concesionarias/$"), "concesionarias"),
+    (re.compile(r"^/concesionarias/(\d+)$"), "concesionaria:{}"),
+    # Las estadísticas cambian con cualquier escritura de vehículos
+    (re.compile(r"^/concesionarias/\d+/stats$"), "vehiculos"),
+    (re.compile(r"^/vehiculos/(?:search|resumen|stats|batch)?$"), "vehiculos"),
+    (re.compile(r"^/vehiculos/(\d+)$"), "vehiculo:{}"),
+]
+
+class CacheBackend:
+    """
+    Almacén de la caché. Las entradas se invalidan por espacio de nombres
+    incrementando su versión, que forma parte de la clave.
+    """
+
+    # Los backends remotos se consultan desde el threadpool
+    blocking = False
+
+    def get(self, key: str) -> Optional[Tuple[bytes, dict]]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Tuple[bytes, dict], ttl: int):
+        raise NotImplementedError
+
+    def version(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def bump(self, namespace: str):
+        raise NotImplementedError
+
+class MemoryBackend(CacheBackend):
+    """LRU con TTL en el proceso; cada worker tiene su propia copia"""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE):
+        self._entries = TTLCache(maxsize=maxsize)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value, ttl):
+        self._entries.set(key, value, ttl=ttl)
+
+    def version(self, namespace):
+        return self._versions.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+
+class RedisBackend(CacheBackend):
+    """Backend compartido entre workers e instancias"""
+
+    blocking = True
+
+    def __init__(self, url: str):
+        import json
+        import redis
+        self._json = json
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._redis.get(f"rc:{key}")
+        if raw is None:
+            return None
+        headers_len = int.from_bytes(raw[:4], "big")
+        headers = self._json.loads(raw[4:4 + headers_len])
+        return raw[4 + headers_len:], headers
+
+    def set(self, key, value, ttl):
+        body, headers = value
+        encoded = self._json.dumps(headers).encode()
+        self._redis.set(f"rc:{key}", len(encoded).to_bytes(4, "big") + encoded + body, ex=ttl)
+
+    def version(self, namespace):
+        return int(self._redis.get(f"rcv:{namespace}") or 0)
+
+    def bump(self, namespace):
+        self._redis.incr(f"rcv:{namespace}")
+
+class ResponseCache:
+
+    def __init__(self, backend: CacheBackend, ttl: int = RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, namespace: str, request_key: str) -> str:
+        """
+        Clave con la versión actual del espacio de nombres. Se calcula una
+        sola vez, antes de ejecutar el handler: si una escritura invalida el
+        espacio mientras tanto, la respuesta (ya vieja) queda guardada bajo
+        la versión anterior y no se vuelve a servir.
+        """
+        return f"{namespace}:{self.backend.version(namespace)}:{request_key}"
+
+    def get(self, key: str):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, body: bytes, headers: dict):
+        self.backend.set(key, (body, headers), self.ttl)
+
+    def invalidate(self, *namespaces: str):
+        for namespace in namespaces:
+            self.backend.bump(namespace)
+
+response_cache = ResponseCache(RedisBackend(REDIS_URL) if REDIS_URL else MemoryBackend())
+
+def invalidar(*namespaces: str):
+    """Descarta las respuestas cacheadas de los espacios de nombres indicados"""
+    response_cache.invalidate(*namespaces)
+
+def _namespace(path: str) -> Optional[str]:
+    for patron, namespace in REGLAS:
+        match = patron.match(path)
+        if match:
+            return namespace.format(*match.groups())
+    return None
+
+async def _run(fn, *args):
+    if response_cache.backend.blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """
+    Sirve desde la caché las lecturas públicas (GET sin Authorization) de
+    las rutas en REGLAS; la clave es la ruta más los parámetros ordenados.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        namespace = None
+        if RESPONSE_CACHE_ENABLED and request.method == "GET" and "authorization" not in request.headers:
+            namespace = _namespace(request.url.path)
+        if namespace is None:
+            return await call_next(request)
+
+        # Parámetros ordenados y codificados de nuevo: un valor con "&" o "="
+        # (por ejemplo color=rojo%26estado%3Dusado) no puede coincidir con
+        # la clave de otra combinación de parámetros
+        request_key = request.url.path + "?" + urlencode(sorted(request.query_params.multi_items()))
+        key = await _run(response_cache.key, namespace, request_key)
+        cached = await _run(response_cache.get, key)
+        if cached is not None:
+            body, headers = cached
+            if "etag" in headers:
+                last_modified = headers.get("last-modified")
+                if no_modificado(
+                    request,
+                    headers["etag"],
+                    parsedate_to_datetime(last_modified) if last_modified else None
+                ):
+                    return Response(status_code=304, headers={
+                        k: v for k, v in headers.items() if k in ("etag", "last-modified")
+                    })
+            return Response(content=body, headers={**headers, "X-Cache": "HIT"})
+
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {k: v for k, v in response.headers.items() if k in HEADERS_CACHEADOS}
+        await _run(response_cache.set, key, body, headers)
+        return Response(content=body, status_code=200, headers={**headers, "X-Cache": "MISS"})
+
+@register_collector
+def _response_cache_metrics():
+    total = response_cache.hits + response_cache.misses
+    return [
+        ("response_cache_hits_total", "counter", "Respuestas servidas desde la caché", response_cache.hits),
+        ("response_cache_misses_total", "counter", "Respuestas calculadas por no estar en la caché", response_cache.misses),
+        ("response_cache_hit_ratio", "gauge", "Proporción de aciertos de la caché de respuestas",
+         round(response_cache.hits / total, 4) if total else 0),
+    ]
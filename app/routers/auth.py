@@ -4,12 +4,14 @@ from sqlalchemy.orm import Session
 from datetime import timedelta
 from .. import schemas, models, auth
 from ..database import get_db
-import traceback
+import logging
 
 router = APIRouter(tags=["autenticación"])
 
+logger = logging.getLogger(__name__)
+
 @router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(
+def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -28,13 +30,13 @@ async def login_for_access_token(
 
 @router.get("/api/usuarios/me", response_model=schemas.Usuario)
 async def get_current_user_info(
-    current_user: models.Usuario = Depends(auth.get_current_user)
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
 ):
     """Obtener información del usuario autenticado"""
     return current_user
 
 @router.post("/usuarios/", response_model=schemas.Usuario)
-async def create_user(user: schemas.UsuarioCreate, db: Session = Depends(get_db)):
+def create_user(user: schemas.UsuarioCreate, db: Session = Depends(get_db)):
     try:
         # Verificar si la concesionaria existe
         concesionaria = db.query(models.Concesionaria).filter(models.Concesionaria.id == user.concesionaria_id).first()
@@ -57,10 +59,12 @@ async def create_user(user: schemas.UsuarioCreate, db: Session = Depends(get_db)
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        logger.info("Usuario creado", extra={"usuario_id": db_user.id, "concesionaria_id": db_user.concesionaria_id})
         return db_user
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error al crear usuario: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error al crear usuario", extra={"concesionaria_id": user.concesionaria_id})
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al crear usuario: {str(e)}"
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from .. import schemas, models, auth
+from ..conditional import poner_validadores, verificar_no_modificado
 from ..database import get_db
-from ..cloudinary_utils import upload_image
+from ..estadisticas import estadisticas_vehiculos
+from ..pagination import MAX_LIMIT, paginar_por_cursor
+from ..response_cache import invalidar
+from ..storage import get_storage
 
 router = APIRouter(
     prefix="/concesionarias",
@@ -11,38 +15,69 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.Concesionaria)
-async def create_concesionaria(
+def create_concesionaria(
     concesionaria: schemas.ConcesionariaCreate,
     db: Session = Depends(get_db)
 ):
     db_concesionaria = models.Concesionaria(**concesionaria.dict())
     db.add(db_concesionaria)
     db.commit()
+    invalidar("concesionarias")
     db.refresh(db_concesionaria)
     return db_concesionaria
 
 @router.get("/", response_model=List[schemas.Concesionaria])
-async def get_concesionarias(
-    skip: int = 0,
-    limit: int = 100,
+def get_concesionarias(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    concesionarias = db.query(models.Concesionaria).offset(skip).limit(limit).all()
+    def paginar(query):
+        if cursor is not None:
+            return paginar_por_cursor(query, "id", [models.Concesionaria.id], cursor, limit, response)
+        return query.order_by(models.Concesionaria.id).offset(skip).limit(limit).all()
+
+    no_modificado = verificar_no_modificado(
+        request, lambda: paginar(db.query(models.Concesionaria.id, models.Concesionaria.version, models.Concesionaria.updated_at))
+    )
+    if no_modificado:
+        return no_modificado
+
+    concesionarias = paginar(db.query(models.Concesionaria))
+    poner_validadores(response, concesionarias)
     return concesionarias
 
 @router.get("/{concesionaria_id}", response_model=schemas.Concesionaria)
-async def get_concesionaria(concesionaria_id: int, db: Session = Depends(get_db)):
+def get_concesionaria(concesionaria_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    no_modificado = verificar_no_modificado(
+        request,
+        lambda: db.query(models.Concesionaria.id, models.Concesionaria.version, models.Concesionaria.updated_at).filter(models.Concesionaria.id == concesionaria_id).all()
+    )
+    if no_modificado:
+        return no_modificado
+
     db_concesionaria = db.query(models.Concesionaria).filter(models.Concesionaria.id == concesionaria_id).first()
     if db_concesionaria is None:
         raise HTTPException(status_code=404, detail="Concesionaria no encontrada")
+    poner_validadores(response, [db_concesionaria])
     return db_concesionaria
 
+@router.get("/{concesionaria_id}/stats", response_model=schemas.EstadisticasVehiculos)
+def get_estadisticas_concesionaria(concesionaria_id: int, db: Session = Depends(get_db)):
+    """Estadísticas del inventario de la concesionaria, para su tablero"""
+    if db.query(models.Concesionaria.id).filter(models.Concesionaria.id == concesionaria_id).first() is None:
+        raise HTTPException(status_code=404, detail="Concesionaria no encontrada")
+    return estadisticas_vehiculos(db, concesionaria_id)
+
 @router.put("/{concesionaria_id}", response_model=schemas.Concesionaria)
-async def update_concesionaria(
+def update_concesionaria(
     concesionaria_id: int,
     concesionaria: schemas.ConcesionariaCreate,
     db: Session = Depends(get_db),
-    current_user: models.Usuario = Depends(auth.get_current_user)
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
 ):
     db_concesionaria = db.query(models.Concesionaria).filter(models.Concesionaria.id == concesionaria_id).first()
     if db_concesionaria is None:
@@ -58,15 +93,17 @@ async def update_concesionaria(
         setattr(db_concesionaria, key, value)
     
     db.commit()
+    # El nombre de la concesionaria aparece en el resumen de vehículos
+    invalidar("concesionarias", f"concesionaria:{concesionaria_id}", "vehiculos")
     db.refresh(db_concesionaria)
     return db_concesionaria
 
 @router.post("/{concesionaria_id}/logo", response_model=schemas.Concesionaria)
-async def upload_logo(
+def upload_logo(
     concesionaria_id: int,
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: models.Usuario = Depends(auth.get_current_user)
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
 ):
     db_concesionaria = db.query(models.Concesionaria).filter(models.Concesionaria.id == concesionaria_id).first()
     if db_concesionaria is None:
@@ -78,8 +115,9 @@ async def upload_logo(
             detail="No tienes permiso para modificar esta concesionaria"
         )
     
-    logo_url = await upload_image(file)
+    logo_url = get_storage().upload(file.file, file.filename, file.content_type)
     db_concesionaria.logo_url = logo_url
     db.commit()
+    invalidar("concesionarias", f"concesionaria:{concesionaria_id}")
     db.refresh(db_concesionaria)
     return db_concesionaria 
\ No newline at end of file
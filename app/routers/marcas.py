@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from .. import schemas, models, auth
+from ..busqueda import actualizar_texto_busqueda
+from ..conditional import poner_validadores, verificar_no_modificado
 from ..database import get_db
+from ..response_cache import invalidar
+from ..pagination import MAX_LIMIT, paginar_por_cursor
 
 router = APIRouter(
     prefix="/marcas",
@@ -10,10 +14,10 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.Marca)
-async def create_marca(
+def create_marca(
     marca: schemas.MarcaCreate,
     db: Session = Depends(get_db),
-    current_user: models.Usuario = Depends(auth.get_current_user)
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
 ):
     db_marca = db.query(models.Marca).filter(models.Marca.nombre == marca.nombre).first()
     if db_marca:
@@ -22,52 +26,82 @@ async def create_marca(
     db_marca = models.Marca(**marca.dict())
     db.add(db_marca)
     db.commit()
+    invalidar("marcas")
     db.refresh(db_marca)
     return db_marca
 
 @router.get("/", response_model=List[schemas.Marca])
-async def get_marcas(
-    skip: int = 0,
-    limit: int = 100,
+def get_marcas(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    marcas = db.query(models.Marca).offset(skip).limit(limit).all()
+    def paginar(query):
+        if cursor is not None:
+            return paginar_por_cursor(query, "id", [models.Marca.id], cursor, limit, response)
+        return query.order_by(models.Marca.id).offset(skip).limit(limit).all()
+
+    no_modificado = verificar_no_modificado(
+        request, lambda: paginar(db.query(models.Marca.id, models.Marca.version, models.Marca.updated_at))
+    )
+    if no_modificado:
+        return no_modificado
+
+    marcas = paginar(db.query(models.Marca))
+    poner_validadores(response, marcas)
     return marcas
 
 
 @router.get("/{marca_id}", response_model=schemas.Marca)
-async def get_marca(marca_id: int, db: Session = Depends(get_db)):
+def get_marca(marca_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    no_modificado = verificar_no_modificado(
+        request,
+        lambda: db.query(models.Marca.id, models.Marca.version, models.Marca.updated_at).filter(models.Marca.id == marca_id).all()
+    )
+    if no_modificado:
+        return no_modificado
+
     db_marca = db.query(models.Marca).filter(models.Marca.id == marca_id).first()
     if db_marca is None:
         raise HTTPException(status_code=404, detail="Marca no encontrada")
+    poner_validadores(response, [db_marca])
     return db_marca
 
 # Endpoint para editar una marca
 @router.put("/{marca_id}", response_model=schemas.Marca)
-async def update_marca(
+def update_marca(
     marca_id: int,
     marca: schemas.MarcaUpdate,
     db: Session = Depends(get_db),
-    current_user: models.Usuario = Depends(auth.get_current_user)
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
 ):
     db_marca = db.query(models.Marca).filter(models.Marca.id == marca_id).first()
     if db_marca is None:
         raise HTTPException(status_code=404, detail="Marca no encontrada")
     db_marca.nombre = marca.nombre
+    db.flush()
+    # El nombre de la marca forma parte del texto de búsqueda de sus vehículos
+    actualizar_texto_busqueda(db, marca_id)
     db.commit()
+    # La búsqueda de vehículos depende del nombre de la marca
+    invalidar("marcas", f"marca:{marca_id}", "vehiculos")
     db.refresh(db_marca)
     return db_marca
 
 # Endpoint para eliminar una marca
 @router.delete("/{marca_id}")
-async def delete_marca(
+def delete_marca(
     marca_id: int,
     db: Session = Depends(get_db),
-    current_user: models.Usuario = Depends(auth.get_current_user)
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
 ):
     db_marca = db.query(models.Marca).filter(models.Marca.id == marca_id).first()
     if db_marca is None:
         raise HTTPException(status_code=404, detail="Marca no encontrada")
     db.delete(db_marca)
     db.commit()
+    invalidar("marcas", f"marca:{marca_id}", "vehiculos")
     return {"detail": "Marca eliminada"}
\ No newline at end of file
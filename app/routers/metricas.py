@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..metrics import render_metrics
+
+router = APIRouter(tags=["métricas"])
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return render_metrics()
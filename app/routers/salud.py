@@ -0,0 +1,32 @@
+import time
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from ..database import engine, pool_status
+
+router = APIRouter(
+    prefix="/health",
+    tags=["salud"]
+)
+
+@router.get("/db")
+def health_db():
+    """
+    Verifica la conexión a la base con un SELECT 1 y devuelve el estado del
+    pool de conexiones. Responde 503 si la base no está disponible.
+    """
+    inicio = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "error", "detail": str(e.__class__.__name__), "pool": pool_status()}
+        )
+    return {
+        "status": "ok",
+        "latencia_ms": round((time.perf_counter() - inicio) * 1000, 3),
+        "pool": pool_status()
+    }
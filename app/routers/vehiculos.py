@@ -1,20 +1,57 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List
-from .. import schemas, models, auth
-from ..database import get_db
-from ..cloudinary_utils import upload_image
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File, Query
+from fastapi.responses import RedirectResponse, StreamingResponse
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+import logging
+from .. import schemas, models, auth, importacion, tareas
+from ..busqueda import buscar_vehiculos
+from ..conditional import poner_validadores, verificar_no_modificado
+from ..database import SessionLocal, get_db
+from ..estadisticas import estadisticas_vehiculos
+from ..filtros import ORDENES_RESUMEN, columnas_orden, filtrar_vehiculos
+from ..pagination import MAX_LIMIT, paginar_por_cursor
+from ..response_cache import invalidar
+from ..serializacion import COLUMNAS_RESUMEN, COLUMNAS_VEHICULO, RespuestaJSONRapida, respuesta_rapida, vehiculos_planos
+from ..imagenes import elegir_variante
+from ..storage import StorageError, get_storage, upload_image, upload_many
 
 router = APIRouter(
     prefix="/vehiculos",
     tags=["vehículos"]
 )
 
+logger = logging.getLogger(__name__)
+
+def _query_vehiculos(db: Session):
+    """
+    Consulta base de vehículos con las imágenes cargadas en una sola
+    consulta adicional (SELECT ... WHERE vehiculo_id IN (...)), evitando
+    una consulta por vehículo al serializar la respuesta.
+    """
+    return db.query(models.Vehiculo).options(selectinload(models.Vehiculo.imagenes))
+
+# Columnas de la consulta liviana de los pedidos condicionales (incluye las
+# claves de ordenamiento que necesita la paginación por cursor)
+CLAVES_VEHICULO = [
+    models.Vehiculo.id,
+    models.Vehiculo.version,
+    models.Vehiculo.updated_at,
+    models.Vehiculo.precio,
+    models.Vehiculo.anio,
+]
+
+# Columnas de los listados por la ruta rápida (ver serializacion.py)
+COLUMNAS_LISTADO = COLUMNAS_VEHICULO + [models.Vehiculo.version, models.Vehiculo.updated_at]
+
+def _get_vehiculo_con_imagenes(db: Session, vehiculo_id: int):
+    return _query_vehiculos(db).filter(models.Vehiculo.id == vehiculo_id).first()
+
 @router.post("/", response_model=schemas.Vehiculo)
-async def create_vehiculo(
+def create_vehiculo(
     vehiculo: schemas.VehiculoCreate,
     db: Session = Depends(get_db),
-    current_user: models.Usuario = Depends(auth.get_current_user)
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
 ):
     # Verificar que el usuario pertenece a la concesionaria
     if current_user.concesionaria_id != vehiculo.concesionaria_id:
@@ -26,34 +63,261 @@ async def create_vehiculo(
     db_vehiculo = models.Vehiculo(**vehiculo.dict())
     db.add(db_vehiculo)
     db.commit()
-    db.refresh(db_vehiculo)
-    return db_vehiculo
+    invalidar("vehiculos")
+    return _get_vehiculo_con_imagenes(db, db_vehiculo.id)
 
-@router.get("/", response_model=List[schemas.Vehiculo])
-async def get_vehiculos(
-    skip: int = 0,
-    limit: int = 100,
-    estado: str = None,
+@router.get("/", response_model=List[schemas.Vehiculo], response_class=RespuestaJSONRapida)
+def get_vehiculos(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    orden: str = "id",
+    filtros: schemas.FiltrosVehiculo = Depends(),
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.Vehiculo)
-    if estado:
-        query = query.filter(models.Vehiculo.estado == estado)
-    return query.offset(skip).limit(limit).all()
+    columnas = columnas_orden(orden)
+
+    def paginar(query):
+        query = filtrar_vehiculos(query, filtros)
+        if cursor is not None:
+            return paginar_por_cursor(query, orden, columnas, cursor, limit, response)
+        return query.order_by(*columnas).offset(skip).limit(limit).all()
+
+    no_modificado = verificar_no_modificado(request, lambda: paginar(db.query(*CLAVES_VEHICULO)))
+    if no_modificado:
+        return no_modificado
+
+    filas = paginar(db.query(*COLUMNAS_LISTADO))
+    poner_validadores(response, filas)
+    return respuesta_rapida(vehiculos_planos(db, filas), response)
+
+@router.get("/search", response_model=List[schemas.Vehiculo], response_class=RespuestaJSONRapida)
+def search_vehiculos(
+    response: Response,
+    q: str,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=MAX_LIMIT),
+    filtros: schemas.FiltrosVehiculo = Depends(),
+    db: Session = Depends(get_db)
+):
+    """
+    Búsqueda de texto completo sobre modelo, marca y descripción
+    (por ejemplo "hilux 4x4 diesel"), ordenada por relevancia
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="La búsqueda no puede estar vacía")
+    query = filtrar_vehiculos(db.query(*COLUMNAS_VEHICULO), filtros)
+    query = buscar_vehiculos(query, q, db.bind.dialect.name)
+    return respuesta_rapida(vehiculos_planos(db, query.offset(skip).limit(limit).all()), response)
+
+@router.get("/stats", response_model=schemas.EstadisticasVehiculos)
+def get_estadisticas_vehiculos(db: Session = Depends(get_db)):
+    """Estadísticas de todo el inventario (cantidades por estado, precios y marcas)"""
+    return estadisticas_vehiculos(db)
+
+@router.get("/resumen", response_model=List[schemas.VehiculoResumen], response_class=RespuestaJSONRapida)
+def get_vehiculos_resumen(
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    orden: str = "id",
+    filtros: schemas.FiltrosVehiculo = Depends(),
+    db: Session = Depends(get_db)
+):
+    """
+    Listado liviano para las tarjetas de la tienda: admite los mismos
+    filtros, órdenes y paginación que GET /vehiculos/, pero lee la proyección
+    vehiculos_resumen con una sola consulta, sin descripción ni imágenes.
+    """
+    columnas = columnas_orden(orden, ORDENES_RESUMEN)
+    query = filtrar_vehiculos(db.query(*COLUMNAS_RESUMEN), filtros, models.VehiculoResumen)
+    if cursor is not None:
+        filas = paginar_por_cursor(query, orden, columnas, cursor, limit, response)
+    else:
+        filas = query.order_by(*columnas).offset(skip).limit(limit).all()
+    return respuesta_rapida([fila._asdict() for fila in filas], response)
+
+# Máximo de ids por consulta de GET /vehiculos/batch
+MAX_VEHICULOS_BATCH = 100
+
+def _parsear_ids(ids: str) -> List[int]:
+    """Ids separados por coma, sin repetidos y en el orden pedido"""
+    try:
+        lista = [int(valor) for valor in ids.split(",") if valor.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids debe ser una lista de números separados por coma")
+    lista = list(dict.fromkeys(lista))
+    if not lista:
+        raise HTTPException(status_code=400, detail="Se debe indicar al menos un id")
+    if len(lista) > MAX_VEHICULOS_BATCH:
+        raise HTTPException(status_code=400, detail=f"Se pueden pedir hasta {MAX_VEHICULOS_BATCH} vehículos por vez")
+    return lista
+
+@router.get("/batch", response_model=schemas.VehiculosLote, response_class=RespuestaJSONRapida)
+def get_vehiculos_batch(ids: str, request: Request, response: Response, db: Session = Depends(get_db)):
+    """
+    Varios vehículos por id (por ejemplo ?ids=12,7,31) en una sola consulta
+    más una para las imágenes, en el orden pedido. Los ids que no existen
+    se informan en no_encontrados.
+    """
+    lista = _parsear_ids(ids)
+    filtro = models.Vehiculo.id.in_(lista)
+    no_modificado = verificar_no_modificado(
+        request,
+        lambda: db.query(*CLAVES_VEHICULO).filter(filtro).order_by(models.Vehiculo.id).all()
+    )
+    if no_modificado:
+        return no_modificado
+
+    filas = db.query(*COLUMNAS_LISTADO).filter(filtro).order_by(models.Vehiculo.id).all()
+    poner_validadores(response, filas)
+    por_id = {vehiculo["id"]: vehiculo for vehiculo in vehiculos_planos(db, filas)}
+    return respuesta_rapida({
+        "vehiculos": [por_id[id_] for id_ in lista if id_ in por_id],
+        "no_encontrados": [id_ for id_ in lista if id_ not in por_id],
+    }, response)
+
+# Filas por lote en la importación y exportación masiva
+IMPORT_BATCH_SIZE = 1000
+EXPORT_BATCH_SIZE = 1000
+MAX_ERRORES_IMPORTACION = 1000
+
+@router.post("/importar", response_model=schemas.ResultadoImportacion)
+def import_vehiculos(
+    file: UploadFile = File(...),
+    formato: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
+):
+    """
+    Importa vehículos desde un archivo CSV (con cabecera) o NDJSON. El archivo
+    se procesa por bloques de IMPORT_BATCH_SIZE filas, cada fila se valida
+    contra VehiculoCreate y los vehículos válidos de cada bloque se insertan
+    con un único INSERT por lotes. Los errores se informan por fila.
+    """
+    formato = formato or importacion.detectar_formato(file.filename, file.content_type)
+    if formato not in importacion.FORMATOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato inválido. Opciones: {', '.join(importacion.FORMATOS)}"
+        )
+
+    marcas = dict(db.query(models.Marca.id, models.Marca.nombre))
+    resultado = schemas.ResultadoImportacion(importados=0, errores=[])
+
+    def registrar_error(fila: int, error: str):
+        if len(resultado.errores) < MAX_ERRORES_IMPORTACION:
+            resultado.errores.append(schemas.ErrorImportacion(fila=fila, error=error))
+        else:
+            resultado.errores_omitidos += 1
+
+    filas = importacion.iter_filas(file.file, formato)
+    try:
+        for bloque in importacion.en_bloques(filas, IMPORT_BATCH_SIZE):
+            vehiculos = []
+            for numero, fila in bloque:
+                try:
+                    vehiculo = importacion.validar_fila(fila, current_user.concesionaria_id)
+                    if vehiculo.concesionaria_id != current_user.concesionaria_id:
+                        raise ValueError("No tienes permiso para crear vehículos en esta concesionaria")
+                    if vehiculo.marca_id not in marcas:
+                        raise ValueError(f"Marca con id {vehiculo.marca_id} no encontrada")
+                    # El INSERT por lotes no dispara los eventos del ORM:
+                    # el texto de búsqueda, el resumen y las estadísticas se calculan aquí
+                    datos = vehiculo.dict()
+                    datos["texto_busqueda"] = models.componer_texto_busqueda(
+                        vehiculo.modelo, marcas[vehiculo.marca_id], vehiculo.descripcion
+                    )
+                    vehiculos.append(datos)
+                except ValueError as e:
+                    registrar_error(numero, importacion.describir_error(e))
+
+            if vehiculos:
+                ids = db.scalars(insert(models.Vehiculo).returning(models.Vehiculo.id), vehiculos).all()
+                models.refrescar_resumen(db.connection(), ids)
+                models.sumar_estadisticas(db.connection(), ids)
+                db.commit()
+                invalidar("vehiculos")
+                resultado.importados += len(vehiculos)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El archivo debe estar codificado en UTF-8 (se importaron {resultado.importados} vehículos)"
+        )
+
+    return resultado
+
+@router.get("/exportar")
+def export_vehiculos(
+    formato: str = "csv",
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
+):
+    """
+    Exporta los vehículos de la concesionaria del usuario en CSV o NDJSON.
+    Las filas se leen de la base y se envían por bloques, sin armar la
+    respuesta completa en memoria.
+    """
+    if formato not in importacion.FORMATOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato inválido. Opciones: {', '.join(importacion.FORMATOS)}"
+        )
+
+    columnas = [getattr(models.Vehiculo, columna) for columna in importacion.COLUMNAS]
+    query = (
+        select(*columnas)
+        .where(models.Vehiculo.concesionaria_id == current_user.concesionaria_id)
+        .order_by(models.Vehiculo.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+    def generar():
+        # Sesión propia: el generador se consume después de que termina el handler
+        db = SessionLocal()
+        try:
+            cabecera = formato == "csv"
+            for bloque in db.execute(query).partitions():
+                if formato == "csv":
+                    yield importacion.a_csv(bloque, cabecera=cabecera)
+                    cabecera = False
+                else:
+                    yield importacion.a_ndjson(bloque)
+            if cabecera:
+                yield importacion.a_csv([], cabecera=True)
+        finally:
+            db.close()
+
+    media_type = "text/csv" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        generar(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="vehiculos.{formato}"'}
+    )
 
 @router.get("/{vehiculo_id}", response_model=schemas.Vehiculo)
-async def get_vehiculo(vehiculo_id: int, db: Session = Depends(get_db)):
-    db_vehiculo = db.query(models.Vehiculo).filter(models.Vehiculo.id == vehiculo_id).first()
+def get_vehiculo(vehiculo_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    no_modificado = verificar_no_modificado(
+        request,
+        lambda: db.query(*CLAVES_VEHICULO).filter(models.Vehiculo.id == vehiculo_id).all()
+    )
+    if no_modificado:
+        return no_modificado
+
+    db_vehiculo = _get_vehiculo_con_imagenes(db, vehiculo_id)
     if db_vehiculo is None:
         raise HTTPException(status_code=404, detail="Vehículo no encontrado")
+    poner_validadores(response, [db_vehiculo])
     return db_vehiculo
 
 @router.put("/{vehiculo_id}", response_model=schemas.Vehiculo)
-async def update_vehiculo(
+def update_vehiculo(
     vehiculo_id: int,
     vehiculo: schemas.VehiculoCreate,
     db: Session = Depends(get_db),
-    current_user: models.Usuario = Depends(auth.get_current_user)
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
 ):
     db_vehiculo = db.query(models.Vehiculo).filter(models.Vehiculo.id == vehiculo_id).first()
     if db_vehiculo is None:
@@ -69,14 +333,14 @@ async def update_vehiculo(
         setattr(db_vehiculo, key, value)
     
     db.commit()
-    db.refresh(db_vehiculo)
-    return db_vehiculo
+    invalidar("vehiculos", f"vehiculo:{vehiculo_id}")
+    return _get_vehiculo_con_imagenes(db, vehiculo_id)
 
 @router.delete("/{vehiculo_id}")
-async def delete_vehiculo(
+def delete_vehiculo(
     vehiculo_id: int,
     db: Session = Depends(get_db),
-    current_user: models.Usuario = Depends(auth.get_current_user)
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
 ):
     db_vehiculo = db.query(models.Vehiculo).filter(models.Vehiculo.id == vehiculo_id).first()
     if db_vehiculo is None:
@@ -88,57 +352,90 @@ async def delete_vehiculo(
             detail="No tienes permiso para eliminar este vehículo"
         )
     
+    # Los archivos se borran del almacenamiento en segundo plano, y solo si
+    # la eliminación se confirma
+    urls = [url for imagen in db_vehiculo.imagenes for url in imagen.urls()]
+    for imagen in db_vehiculo.imagenes:
+        db.delete(imagen)
+    if urls:
+        tareas.encolar(db, "eliminar_imagenes", {"urls": urls})
     db.delete(db_vehiculo)
     db.commit()
+    tareas.notificar()
+    invalidar("vehiculos", f"vehiculo:{vehiculo_id}")
     return {"message": "Vehículo eliminado"}
 
+# Tamaño máximo por imagen y cantidad máxima de imágenes por lote
+MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
+MAX_IMAGENES_LOTE = 50
+
+def _validar_imagen(file: UploadFile):
+    """Retorna el motivo por el que el archivo no es aceptable, o None"""
+    if not (file.content_type or "").startswith('image/'):
+        return "El archivo debe ser una imagen"
+
+    # Verificar tamaño del archivo
+    file.file.seek(0, 2)  # Ir al final del archivo
+    file_size = file.file.tell()  # Obtener tamaño
+    file.file.seek(0)  # Volver al inicio
+
+    if file_size > MAX_IMAGE_SIZE:
+        return "El archivo es demasiado grande"
+    return None
+
+def _get_vehiculo_propio(db: Session, vehiculo_id: int, current_user: auth.UsuarioActual, detail: str):
+    db_vehiculo = db.query(models.Vehiculo).filter(models.Vehiculo.id == vehiculo_id).first()
+    if db_vehiculo is None:
+        raise HTTPException(status_code=404, detail="Vehículo no encontrado")
+    if current_user.concesionaria_id != db_vehiculo.concesionaria_id:
+        raise HTTPException(status_code=403, detail=detail)
+    return db_vehiculo
+
 @router.post("/{vehiculo_id}/imagenes/", response_model=schemas.Imagen)
-async def upload_vehiculo_image(
+def upload_vehiculo_image(
     vehiculo_id: int,
     file: UploadFile,
     db: Session = Depends(get_db),
-    current_user: models.Usuario = Depends(auth.get_current_user)
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
 ):
     try:
         # Validar el archivo
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
-            
-        # Verificar tamaño del archivo (max 5MB)
-        file_size = 0
-        file.file.seek(0, 2)  # Ir al final del archivo
-        file_size = file.file.tell()  # Obtener tamaño
-        file.file.seek(0)  # Volver al inicio
-        
-        if file_size > 5 * 1024 * 1024:  # 5MB
-            raise HTTPException(status_code=400, detail="El archivo es demasiado grande")
+        error = _validar_imagen(file)
+        if error:
+            raise HTTPException(status_code=400, detail=error)
 
         # Verificar vehículo
-        print(f"Buscando vehículo con ID: {vehiculo_id}")
         db_vehiculo = db.query(models.Vehiculo).filter(models.Vehiculo.id == vehiculo_id).first()
         if db_vehiculo is None:
             raise HTTPException(status_code=404, detail="Vehículo no encontrado")
         
         # Verificar permisos
-        print(f"Verificando permisos - Usuario concesionaria_id: {current_user.concesionaria_id}, Vehículo concesionaria_id: {db_vehiculo.concesionaria_id}")
         if current_user.concesionaria_id != db_vehiculo.concesionaria_id:
+            logger.debug(
+                "Permiso denegado para subir imagen",
+                extra={"usuario_id": current_user.id, "vehiculo_id": vehiculo_id}
+            )
             raise HTTPException(
                 status_code=403,
                 detail="No tienes permiso para añadir imágenes a este vehículo"
             )
         
-        # Subir imagen
-        print("Intentando subir imagen a Cloudinary")
-        image_url = await upload_image(file)
-        print(f"Imagen subida exitosamente: {image_url}")
+        # Subir imagen y sus versiones reducidas
+        logger.debug("Subiendo imagen", extra={"vehiculo_id": vehiculo_id, "archivo": file.filename})
+        image_url, variantes = upload_image(get_storage(), file)
         
         # Guardar en base de datos
-        print("Guardando información en la base de datos")
-        db_imagen = models.Imagen(url=image_url, vehiculo_id=vehiculo_id)
+        db_imagen = models.Imagen(url=image_url, variantes=variantes, vehiculo_id=vehiculo_id)
         db.add(db_imagen)
+        db.flush()
+        tareas.encolar(db, "generar_miniatura", {"imagen_id": db_imagen.id})
+        # Las imágenes forman parte de la representación del vehículo
+        db_vehiculo.updated_at = models.ahora()
         db.commit()
+        tareas.notificar()
+        invalidar("vehiculos", f"vehiculo:{vehiculo_id}")
         db.refresh(db_imagen)
-        print("Imagen guardada exitosamente en la base de datos")
+        logger.info("Imagen subida", extra={"vehiculo_id": vehiculo_id, "imagen_id": db_imagen.id, "url": image_url})
         
         return db_imagen
         
@@ -146,18 +443,104 @@ async def upload_vehiculo_image(
         # Re-lanzar excepciones HTTP
         raise he
     except Exception as e:
-        print(f"Error inesperado: {str(e)}")
-        # Log el error completo
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Error inesperado al procesar la imagen", extra={"vehiculo_id": vehiculo_id})
         raise HTTPException(status_code=500, detail=f"Error al procesar la imagen: {str(e)}")
 
 
+@router.post("/{vehiculo_id}/imagenes/lote", response_model=schemas.SubidaLote)
+def upload_vehiculo_images(
+    vehiculo_id: int,
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
+):
+    """
+    Sube varias imágenes en una sola petición. Todos los archivos se validan
+    antes de transferir ninguno, las subidas corren en paralelo (acotado por
+    UPLOAD_CONCURRENCY) y las imágenes subidas se guardan en una sola
+    transacción. El resultado se informa por archivo.
+    """
+    if len(files) > MAX_IMAGENES_LOTE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Se permiten como máximo {MAX_IMAGENES_LOTE} imágenes por lote"
+        )
+
+    db_vehiculo = _get_vehiculo_propio(db, vehiculo_id, current_user, "No tienes permiso para añadir imágenes a este vehículo")
+
+    resultados = [schemas.ResultadoSubida(filename=file.filename or "") for file in files]
+    validos = []
+    for resultado, file in zip(resultados, files):
+        resultado.error = _validar_imagen(file)
+        if resultado.error is None:
+            validos.append((resultado, file))
+
+    subidas = upload_many(get_storage(), [file for _, file in validos])
+
+    db_imagenes = []
+    for (resultado, _), subida in zip(validos, subidas):
+        if isinstance(subida, Exception):
+            resultado.error = str(subida)
+        else:
+            url, variantes = subida
+            db_imagen = models.Imagen(url=url, variantes=variantes, vehiculo_id=vehiculo_id)
+            db_imagenes.append((resultado, db_imagen))
+
+    if db_imagenes:
+        db.add_all([db_imagen for _, db_imagen in db_imagenes])
+        db_vehiculo.updated_at = models.ahora()
+        try:
+            db.flush()
+            for _, db_imagen in db_imagenes:
+                tareas.encolar(db, "generar_miniatura", {"imagen_id": db_imagen.id})
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Las imágenes ya subidas quedarían huérfanas
+            for _, db_imagen in db_imagenes:
+                for url in db_imagen.urls():
+                    try:
+                        get_storage().delete(url)
+                    except StorageError:
+                        pass
+            raise
+        tareas.notificar()
+        invalidar("vehiculos", f"vehiculo:{vehiculo_id}")
+        for resultado, db_imagen in db_imagenes:
+            resultado.imagen = schemas.Imagen.model_validate(db_imagen)
+
+    return schemas.SubidaLote(
+        subidas=sum(1 for r in resultados if r.imagen is not None),
+        fallidas=sum(1 for r in resultados if r.imagen is None),
+        resultados=resultados
+    )
+
+@router.get("/imagenes/{imagen_id}/archivo")
+def get_imagen_archivo(
+    imagen_id: int,
+    request: Request,
+    ancho: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Redirige a la versión más chica de la imagen que cubre el ancho pedido,
+    en WebP si el navegador lo acepta. Sirve para usar directamente en <img src>.
+    """
+    fila = db.query(models.Imagen.url, models.Imagen.variantes).filter(models.Imagen.id == imagen_id).first()
+    if fila is None:
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+    webp = "image/webp" in request.headers.get("accept", "")
+    return RedirectResponse(
+        elegir_variante(fila.url, fila.variantes, ancho, webp),
+        status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        headers={"Vary": "Accept", "Cache-Control": "public, max-age=86400"}
+    )
+
 @router.delete("/imagenes/{imagen_id}")
-async def delete_vehiculo_image(
+def delete_vehiculo_image(
     imagen_id: int,
     db: Session = Depends(get_db),
-    current_user: models.Usuario = Depends(auth.get_current_user)
+    current_user: auth.UsuarioActual = Depends(auth.get_current_user)
 ):
     try:
         # Buscar la imagen
@@ -177,26 +560,21 @@ async def delete_vehiculo_image(
                 detail="No tienes permiso para eliminar esta imagen"
             )
         
-        # Extraer public_id de la URL de Cloudinary para eliminar la imagen
-        # URL típica: https://res.cloudinary.com/cloud_name/image/upload/v1234567890/public_id.jpg
-        url_parts = db_imagen.url.split('/')
-        if len(url_parts) >= 2:
-            public_id = url_parts[-1].split('.')[0]  # Obtener el nombre sin extensión
-            
-            # Eliminar de Cloudinary
-            from ..cloudinary_utils import delete_image
-            await delete_image(public_id)
-        
-        # Eliminar de la base de datos
+        # Eliminar de la base de datos; el archivo se borra del
+        # almacenamiento en segundo plano
+        vehiculo_id = db_vehiculo.id
+        tareas.encolar(db, "eliminar_imagenes", {"urls": db_imagen.urls()})
         db.delete(db_imagen)
+        db_vehiculo.updated_at = models.ahora()
         db.commit()
+        tareas.notificar()
+        invalidar("vehiculos", f"vehiculo:{vehiculo_id}")
+        logger.info("Imagen eliminada", extra={"vehiculo_id": vehiculo_id, "imagen_id": imagen_id})
         
         return {"message": "Imagen eliminada exitosamente"}
         
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Error al eliminar imagen: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Error al eliminar imagen", extra={"imagen_id": imagen_id})
         raise HTTPException(status_code=500, detail=f"Error al eliminar la imagen: {str(e)}")
\ No newline at end of file
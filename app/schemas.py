@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 # Esquemas para Concesionaria
 class ConcesionariaBase(BaseModel):
@@ -71,6 +71,18 @@ class VehiculoBase(BaseModel):
 class VehiculoCreate(VehiculoBase):
     pass
 
+class FiltrosVehiculo(BaseModel):
+    """Filtros del listado de vehículos (parámetros de query)"""
+    estado: Optional[str] = None
+    marca_id: Optional[int] = None
+    concesionaria_id: Optional[int] = None
+    anio_min: Optional[int] = None
+    anio_max: Optional[int] = None
+    precio_min: Optional[int] = None
+    precio_max: Optional[int] = None
+    color: Optional[str] = None
+    modelo: Optional[str] = None
+
 class Vehiculo(VehiculoBase):
     id: int
     imagenes: List["Imagen"] = []
@@ -78,6 +90,35 @@ class Vehiculo(VehiculoBase):
     class Config:
         from_attributes = True
 
+class VehiculoResumen(BaseModel):
+    """Datos de la tarjeta del listado (ver models.VehiculoResumen)"""
+    id: int
+    modelo: str
+    anio: int
+    precio: int
+    estado: str
+    marca: Optional[str] = None
+    concesionaria: Optional[str] = None
+    miniatura_url: Optional[str] = None
+
+# Estadísticas del inventario (ver models.EstadisticaVehiculos)
+class EstadisticasPrecio(BaseModel):
+    minimo: Optional[int] = None
+    promedio: Optional[float] = None
+    maximo: Optional[int] = None
+
+class EstadisticasMarca(BaseModel):
+    marca_id: Optional[int] = None
+    marca: Optional[str] = None
+    cantidad: int
+    precio: EstadisticasPrecio
+
+class EstadisticasVehiculos(BaseModel):
+    cantidad: int
+    por_estado: Dict[str, int]
+    precio: EstadisticasPrecio
+    por_marca: List[EstadisticasMarca]
+
 # Esquemas para Imagen
 class ImagenBase(BaseModel):
     url: str
@@ -86,11 +127,44 @@ class ImagenBase(BaseModel):
 class ImagenCreate(ImagenBase):
     pass
 
+class VarianteImagen(BaseModel):
+    ancho: int
+    formato: str  # jpeg o webp
+    url: str
+
 class Imagen(ImagenBase):
     id: int
+    miniatura_url: Optional[str] = None
+    variantes: List[VarianteImagen] = []
 
     class Config:
         from_attributes = True
 
+# Resultado de la subida de imágenes por lote
+class ResultadoSubida(BaseModel):
+    filename: str
+    imagen: Optional[Imagen] = None
+    error: Optional[str] = None
+
+class SubidaLote(BaseModel):
+    subidas: int
+    fallidas: int
+    resultados: List[ResultadoSubida]
+
+# Resultado de la importación masiva de vehículos
+class ErrorImportacion(BaseModel):
+    fila: int
+    error: str
+
+class ResultadoImportacion(BaseModel):
+    importados: int
+    errores: List[ErrorImportacion]
+    errores_omitidos: int = 0
+
+# Resultado de la consulta de varios vehículos por id
+class VehiculosLote(BaseModel):
+    vehiculos: List[Vehiculo]
+    no_encontrados: List[int]
+
 # Actualizar las referencias forward
-Vehiculo.model_rebuild() 
\ No newline at end of file
+Vehiculo.model_rebuild() 
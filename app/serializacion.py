@@ -0,0 +1,64 @@
+from collections import defaultdict
+from typing import Any, Iterable, List
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from . import models, schemas
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+class RespuestaJSONRapida(JSONResponse):
+    """
+    Respuesta JSON serializada con orjson (con json de la librería estándar
+    si no está instalado). Se usa para devolver contenido ya armado con
+    tipos simples, sin validarlo contra el response_model ni pasar por
+    jsonable_encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+# Columnas que se leen para armar schemas.Vehiculo y schemas.Imagen, en el
+# mismo orden y con los mismos nombres que los esquemas
+CAMPOS_VEHICULO = [campo for campo in schemas.Vehiculo.model_fields if campo != "imagenes"]
+CAMPOS_IMAGEN = list(schemas.Imagen.model_fields)
+COLUMNAS_VEHICULO = [getattr(models.Vehiculo, campo) for campo in CAMPOS_VEHICULO]
+COLUMNAS_IMAGEN = [getattr(models.Imagen, campo) for campo in CAMPOS_IMAGEN]
+
+CAMPOS_RESUMEN = list(schemas.VehiculoResumen.model_fields)
+COLUMNAS_RESUMEN = [getattr(models.VehiculoResumen, campo) for campo in CAMPOS_RESUMEN]
+
+def vehiculos_planos(db: Session, filas: Iterable) -> List[dict]:
+    """
+    Arma la forma de schemas.Vehiculo a partir de filas de una consulta por
+    columnas (al menos COLUMNAS_VEHICULO), con las imágenes de todos los
+    vehículos leídas en una sola consulta. No crea objetos del ORM.
+    """
+    vehiculos = [{campo: getattr(fila, campo) for campo in CAMPOS_VEHICULO} for fila in filas]
+    if not vehiculos:
+        return vehiculos
+
+    imagenes = defaultdict(list)
+    consulta = (
+        db.query(*COLUMNAS_IMAGEN)
+        .filter(models.Imagen.vehiculo_id.in_([v["id"] for v in vehiculos]))
+        .order_by(models.Imagen.id)
+    )
+    for imagen in consulta:
+        imagenes[imagen.vehiculo_id].append(dict(zip(CAMPOS_IMAGEN, imagen)))
+    for vehiculo in vehiculos:
+        vehiculo["imagenes"] = imagenes.get(vehiculo["id"], [])
+    return vehiculos
+
+def respuesta_rapida(contenido: Any, response: Response) -> RespuestaJSONRapida:
+    """
+    Envuelve el contenido en una RespuestaJSONRapida conservando las
+    cabeceras que el handler ya puso en `response` (cursor, ETag, ...)
+    """
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return RespuestaJSONRapida(contenido, status_code=response.status_code or 200, headers=headers)
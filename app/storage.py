@@ -0,0 +1,166 @@
+import io
+import logging
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, List, Optional, Tuple, Union
+from fastapi import UploadFile
+from dotenv import load_dotenv
+from .imagenes import generar_variantes
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Backend de almacenamiento de imágenes: "cloudinary" (producción) o "local"
+# (disco, para desarrollo, tests y benchmarks sin conexión)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "cloudinary")
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", "media")
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", "/media")
+
+# Tamaño de los bloques en que se transfieren los archivos
+CHUNK_SIZE = 1024 * 1024
+
+# Subidas simultáneas como máximo en los lotes de imágenes (entre todas las peticiones)
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+
+# Ancho y alto de las miniaturas (recortadas al centro)
+THUMBNAIL_SIZE = (400, 300)
+
+class StorageError(Exception):
+    pass
+
+class StorageBackend:
+    """
+    Interfaz de almacenamiento de imágenes. Las operaciones son bloqueantes:
+    se llaman desde handlers `def`, que FastAPI ejecuta en su threadpool.
+    """
+
+    def upload(self, fileobj: BinaryIO, filename: str, content_type: Optional[str] = None) -> str:
+        """Sube el archivo (leyéndolo por bloques) y retorna su URL pública"""
+        raise NotImplementedError
+
+    def delete(self, url: str) -> bool:
+        """Elimina el archivo correspondiente a una URL retornada por upload"""
+        raise NotImplementedError
+
+    def thumbnail(self, url: str) -> Optional[str]:
+        """Genera la miniatura de una imagen subida y retorna su URL (None si no se soporta)"""
+        return None
+
+    def variants(self, url: str, fileobj: BinaryIO) -> List[dict]:
+        """
+        Genera y sube las versiones reducidas de una imagen recién subida.
+        Retorna una lista de {"ancho", "formato", "url"}.
+        """
+        base = os.path.splitext(os.path.basename(url))[0]
+        variantes = []
+        for ancho, formato, datos in generar_variantes(fileobj.read()):
+            extension = "jpg" if formato == "jpeg" else formato
+            variante_url = self.upload(io.BytesIO(datos), f"{base}_{ancho}.{extension}", f"image/{formato}")
+            variantes.append({"ancho": ancho, "formato": formato, "url": variante_url})
+        return variantes
+
+class LocalStorage(StorageBackend):
+    """Guarda los archivos en disco y los sirve bajo LOCAL_STORAGE_URL"""
+
+    def __init__(self, base_dir: str = LOCAL_STORAGE_DIR, base_url: str = LOCAL_STORAGE_URL):
+        self.base_dir = base_dir
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def upload(self, fileobj: BinaryIO, filename: str, content_type: Optional[str] = None) -> str:
+        extension = os.path.splitext(filename or "")[1].lower()
+        nombre = f"{uuid.uuid4().hex}{extension}"
+        try:
+            with open(os.path.join(self.base_dir, nombre), "wb") as destino:
+                shutil.copyfileobj(fileobj, destino, CHUNK_SIZE)
+        except OSError as e:
+            raise StorageError(f"Error al guardar imagen en disco: {str(e)}")
+        return f"{self.base_url}/{nombre}"
+
+    def delete(self, url: str) -> bool:
+        ruta = os.path.join(self.base_dir, os.path.basename(url))
+        try:
+            os.remove(ruta)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            raise StorageError(f"Error al eliminar imagen de disco: {str(e)}")
+
+    def thumbnail(self, url: str) -> Optional[str]:
+        # Pillow es opcional en desarrollo: sin él las tarjetas usan la imagen original
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:
+            return None
+        base, _ = os.path.splitext(os.path.basename(url))
+        nombre = f"{base}_miniatura.jpg"
+        try:
+            with Image.open(os.path.join(self.base_dir, os.path.basename(url))) as imagen:
+                miniatura = ImageOps.fit(imagen.convert("RGB"), THUMBNAIL_SIZE)
+            miniatura.save(os.path.join(self.base_dir, nombre), "JPEG", quality=80)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            raise StorageError(f"Error al generar miniatura: {str(e)}")
+        return f"{self.base_url}/{nombre}"
+
+_storage: Optional[StorageBackend] = None
+
+def get_storage() -> StorageBackend:
+    """Retorna el backend configurado en STORAGE_BACKEND"""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "local":
+            _storage = LocalStorage()
+        elif STORAGE_BACKEND == "cloudinary":
+            from .cloudinary_utils import CloudinaryStorage
+            _storage = CloudinaryStorage()
+        else:
+            raise StorageError(f"STORAGE_BACKEND desconocido: {STORAGE_BACKEND}")
+    return _storage
+
+def _tras_fork():
+    # Cada proceso crea su backend (y sus conexiones) con el primer uso
+    global _storage
+    _storage = None
+
+os.register_at_fork(after_in_child=_tras_fork)
+
+def set_storage(storage: StorageBackend):
+    """Reemplaza el backend activo (tests y benchmarks)"""
+    global _storage
+    _storage = storage
+
+_upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY, thread_name_prefix="upload")
+
+def upload_image(storage: StorageBackend, file: UploadFile) -> Tuple[str, List[dict]]:
+    """
+    Sube una imagen y sus versiones reducidas. Si no se pueden generar (por
+    ejemplo, un formato que Pillow no reconoce) queda solo la original.
+    """
+    url = storage.upload(file.file, file.filename, file.content_type)
+    file.file.seek(0)
+    try:
+        variantes = storage.variants(url, file.file)
+    except Exception:
+        logger.warning("No se pudieron generar las variantes de la imagen", exc_info=True, extra={"url": url})
+        variantes = []
+    return url, variantes
+
+def upload_many(storage: StorageBackend, files: List[UploadFile]) -> List[Union[Tuple[str, List[dict]], Exception]]:
+    """
+    Sube varias imágenes (con sus variantes) en paralelo y retorna, en el
+    mismo orden, (URL, variantes) de cada una o la excepción con la que falló
+    """
+    futures = [_upload_executor.submit(upload_image, storage, file) for file in files]
+    resultados = []
+    for future in futures:
+        try:
+            resultados.append(future.result())
+        except Exception as e:
+            resultados.append(e)
+    return resultados
@@ -0,0 +1,340 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal
+from .metrics import Histogram, register_collector
+from .response_cache import invalidar
+from .storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Cola de tareas en segundo plano: las tareas se guardan en la tabla
+# "tareas" y las ejecuta un grupo de workers asyncio en cada proceso de la
+# API. El trabajo bloqueante (base y almacenamiento) corre en un pool de
+# hilos propio, separado del threadpool de las peticiones.
+TAREAS_HABILITADAS = os.getenv("TAREAS_HABILITADAS", "true").lower() == "true"
+TAREAS_WORKERS = int(os.getenv("TAREAS_WORKERS", "2"))
+# Espera máxima entre consultas a la tabla cuando no llegan avisos
+# (reintentos programados y tareas encoladas por otros procesos)
+TAREAS_POLL_SEGUNDOS = float(os.getenv("TAREAS_POLL_SEGUNDOS", "2"))
+# Plazo de una tarea en curso: si el proceso muere, otro la retoma al vencer
+TAREAS_PLAZO_SEGUNDOS = int(os.getenv("TAREAS_PLAZO_SEGUNDOS", "300"))
+TAREAS_MAX_INTENTOS = int(os.getenv("TAREAS_MAX_INTENTOS", "5"))
+# Backoff exponencial con jitter entre reintentos
+TAREAS_BACKOFF_BASE = float(os.getenv("TAREAS_BACKOFF_BASE", "5"))
+TAREAS_BACKOFF_MAX = float(os.getenv("TAREAS_BACKOFF_MAX", "600"))
+# Cada cuánto se buscan imágenes huérfanas y días que se conservan las tareas completadas
+LIMPIEZA_INTERVALO_SEGUNDOS = int(os.getenv("LIMPIEZA_INTERVALO_SEGUNDOS", "3600"))
+TAREAS_RETENCION_DIAS = int(os.getenv("TAREAS_RETENCION_DIAS", "7"))
+
+_tareas: Dict[str, Callable[..., None]] = {}
+
+def tarea(tipo: str):
+    """Registra la función que ejecuta las tareas de un tipo"""
+    def registrar(funcion):
+        _tareas[tipo] = funcion
+        return funcion
+    return registrar
+
+def encolar(db: Session, tipo: str, payload: dict = None, demora: float = 0) -> models.Tarea:
+    """
+    Agrega una tarea a la sesión; se guarda con el commit de la operación
+    que la origina. Después del commit conviene llamar a notificar().
+    """
+    if tipo not in _tareas:
+        raise ValueError(f"Tipo de tarea desconocido: {tipo}")
+    db_tarea = models.Tarea(
+        tipo=tipo,
+        payload=payload or {},
+        max_intentos=TAREAS_MAX_INTENTOS,
+        disponible_en=models.ahora() + timedelta(seconds=demora)
+    )
+    db.add(db_tarea)
+    return db_tarea
+
+def backoff(intentos: int) -> float:
+    """Segundos hasta el próximo intento, con jitter para no sincronizar reintentos"""
+    return random.uniform(0.5, 1.0) * min(TAREAS_BACKOFF_BASE * 2 ** (intentos - 1), TAREAS_BACKOFF_MAX)
+
+def _reclamar() -> Optional[models.Tarea]:
+    """
+    Toma la próxima tarea disponible: pendiente o en curso con el plazo
+    vencido y reintentos disponibles. El UPDATE condicional garantiza que
+    un solo worker (de este u otro proceso) se queda con cada tarea.
+    """
+    with SessionLocal() as db:
+        ahora = models.ahora()
+        # Una tarea que agotó sus intentos y cuyo worker murió (o la cuelga
+        # siempre) no se retoma más
+        vencidas = db.execute(
+            update(models.Tarea)
+            .where(
+                models.Tarea.estado == "en_curso",
+                models.Tarea.disponible_en <= ahora,
+                models.Tarea.intentos >= models.Tarea.max_intentos
+            )
+            .values(estado="fallida", error="Plazo vencido tras agotar los intentos", updated_at=ahora)
+        )
+        if vencidas.rowcount:
+            db.commit()
+            logger.error("Tareas fallidas por plazo vencido", extra={"cantidad": vencidas.rowcount})
+        disponible = (
+            or_(
+                models.Tarea.estado == "pendiente",
+                and_(models.Tarea.estado == "en_curso", models.Tarea.intentos < models.Tarea.max_intentos)
+            ),
+            models.Tarea.disponible_en <= ahora,
+        )
+        candidatas = db.scalars(
+            select(models.Tarea.id)
+            .where(*disponible)
+            .order_by(models.Tarea.disponible_en, models.Tarea.id)
+            .limit(TAREAS_WORKERS + 1)
+        ).all()
+        for tarea_id in candidatas:
+            resultado = db.execute(
+                update(models.Tarea)
+                .where(models.Tarea.id == tarea_id, *disponible)
+                .values(
+                    estado="en_curso",
+                    intentos=models.Tarea.intentos + 1,
+                    disponible_en=ahora + timedelta(seconds=TAREAS_PLAZO_SEGUNDOS),
+                    updated_at=ahora
+                )
+            )
+            if resultado.rowcount == 1:
+                db.commit()
+                db_tarea = db.get(models.Tarea, tarea_id)
+                db.expunge(db_tarea)
+                return db_tarea
+        return None
+
+def _terminar(db_tarea: models.Tarea, error: Optional[str]):
+    """Marca la tarea como completada, o la reprograma o la da por fallida"""
+    ahora = models.ahora()
+    if error is None:
+        valores = {"estado": "completada", "error": None}
+    elif db_tarea.intentos < db_tarea.max_intentos:
+        valores = {
+            "estado": "pendiente",
+            "error": error,
+            "disponible_en": ahora + timedelta(seconds=backoff(db_tarea.intentos)),
+        }
+    else:
+        valores = {"estado": "fallida", "error": error}
+    with SessionLocal() as db:
+        # Si el plazo venció y otro worker la retomó, el resultado es suyo
+        db.execute(
+            update(models.Tarea)
+            .where(
+                models.Tarea.id == db_tarea.id,
+                models.Tarea.estado == "en_curso",
+                models.Tarea.intentos == db_tarea.intentos
+            )
+            .values(updated_at=ahora, **valores)
+        )
+        db.commit()
+    return valores["estado"]
+
+def _ejecutar(db_tarea: models.Tarea) -> str:
+    funcion = _tareas.get(db_tarea.tipo)
+    inicio = time.perf_counter()
+    try:
+        if funcion is None:
+            raise ValueError(f"Tipo de tarea desconocido: {db_tarea.tipo}")
+        funcion(**db_tarea.payload)
+        error = None
+    except Exception as e:
+        logger.warning(
+            "Tarea con error",
+            exc_info=True,
+            extra={"tarea_id": db_tarea.id, "tipo": db_tarea.tipo, "intento": db_tarea.intentos}
+        )
+        error = f"{type(e).__name__}: {e}"
+    resultado = _terminar(db_tarea, error)
+    _duracion.setdefault(db_tarea.tipo, Histogram()).observe(time.perf_counter() - inicio)
+    _contar(db_tarea.tipo, resultado)
+    if resultado == "fallida":
+        logger.error("Tarea fallida", extra={"tarea_id": db_tarea.id, "tipo": db_tarea.tipo, "error": error})
+    return resultado
+
+class ColaTareas:
+    """Workers asyncio que toman y ejecutan las tareas de la tabla"""
+
+    def __init__(self, workers: int = TAREAS_WORKERS):
+        self.workers = workers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._aviso: Optional[asyncio.Event] = None
+        self._detener = False
+        self._tareas_asyncio = []
+        self.en_curso = 0
+
+    async def iniciar(self):
+        self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tareas")
+        self._aviso = asyncio.Event()
+        self._detener = False
+        self._tareas_asyncio = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        # Sin esperar: el arranque no depende de que la base responda
+        self._tareas_asyncio.append(asyncio.create_task(self._programar_limpieza()))
+        logger.info("Cola de tareas iniciada", extra={"workers": self.workers})
+
+    async def detener(self, espera: float = 10):
+        """Deja de tomar tareas y espera las que están en curso"""
+        if self._loop is None:
+            return
+        self._detener = True
+        self._aviso.set()
+        pendientes = set()
+        if self._tareas_asyncio:
+            _, pendientes = await asyncio.wait(self._tareas_asyncio, timeout=espera)
+        for pendiente in pendientes:
+            # Las que no terminan se retoman cuando vence su plazo
+            pendiente.cancel()
+        self._executor.shutdown(wait=False)
+        self._loop = None
+
+    def notificar(self):
+        """Despierta a los workers; se puede llamar desde cualquier hilo"""
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._aviso.set)
+            except RuntimeError:
+                # El loop ya se cerró
+                pass
+
+    async def _programar_limpieza(self):
+        try:
+            await self._loop.run_in_executor(self._executor, programar_limpieza)
+        except Exception:
+            logger.exception("No se pudo programar la limpieza de imágenes huérfanas")
+
+    async def _worker(self):
+        while not self._detener:
+            self._aviso.clear()
+            try:
+                db_tarea = await self._loop.run_in_executor(self._executor, _reclamar)
+            except Exception:
+                logger.exception("Error al tomar tareas de la cola")
+                db_tarea = None
+            if db_tarea is None:
+                try:
+                    await asyncio.wait_for(self._aviso.wait(), TAREAS_POLL_SEGUNDOS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.en_curso += 1
+            try:
+                await self._loop.run_in_executor(self._executor, _ejecutar, db_tarea)
+            except Exception:
+                logger.exception("Error al registrar el resultado de una tarea", extra={"tarea_id": db_tarea.id})
+            finally:
+                self.en_curso -= 1
+
+cola = ColaTareas()
+
+def notificar():
+    cola.notificar()
+
+# Tareas
+
+@tarea("eliminar_imagenes")
+def eliminar_imagenes(urls):
+    """Borra archivos del almacenamiento; borrar uno que ya no existe no es un error"""
+    storage = get_storage()
+    for url in urls:
+        storage.delete(url)
+
+@tarea("generar_miniatura")
+def generar_miniatura(imagen_id):
+    with SessionLocal() as db:
+        db_imagen = db.get(models.Imagen, imagen_id)
+        if db_imagen is None or db_imagen.miniatura_url:
+            return
+        url = get_storage().thumbnail(db_imagen.url)
+        if url is None:
+            return
+        db.expire_all()
+        db_imagen = db.get(models.Imagen, imagen_id)
+        if db_imagen is None or db_imagen.vehiculo_id is None:
+            # La imagen se eliminó mientras se generaba
+            get_storage().delete(url)
+            return
+        db_imagen.miniatura_url = url
+        db_imagen.vehiculo.updated_at = models.ahora()
+        vehiculo_id = db_imagen.vehiculo_id
+        db.commit()
+    invalidar("vehiculos", f"vehiculo:{vehiculo_id}")
+
+@tarea("limpiar_huerfanas")
+def limpiar_huerfanas(lote: int = 500):
+    """
+    Elimina las imágenes sin vehículo (y sus archivos) y las tareas
+    completadas viejas, y se vuelve a programar
+    """
+    with SessionLocal() as db:
+        while True:
+            huerfanas = db.scalars(
+                select(models.Imagen).where(models.Imagen.vehiculo_id.is_(None)).limit(lote)
+            ).all()
+            if not huerfanas:
+                break
+            urls = [url for imagen in huerfanas for url in imagen.urls()]
+            if urls:
+                encolar(db, "eliminar_imagenes", {"urls": urls})
+            for imagen in huerfanas:
+                db.delete(imagen)
+            db.commit()
+            logger.info("Imágenes huérfanas eliminadas", extra={"cantidad": len(huerfanas)})
+
+        db.execute(
+            delete(models.Tarea).where(
+                models.Tarea.estado == "completada",
+                models.Tarea.updated_at < models.ahora() - timedelta(days=TAREAS_RETENCION_DIAS)
+            )
+        )
+        encolar(db, "limpiar_huerfanas", demora=LIMPIEZA_INTERVALO_SEGUNDOS)
+        db.commit()
+
+def programar_limpieza():
+    """Encola la limpieza periódica si no hay una programada"""
+    with SessionLocal() as db:
+        programada = db.scalar(
+            select(models.Tarea.id).where(
+                models.Tarea.tipo == "limpiar_huerfanas",
+                models.Tarea.estado.in_(("pendiente", "en_curso"))
+            ).limit(1)
+        )
+        if programada is None:
+            encolar(db, "limpiar_huerfanas")
+            db.commit()
+
+# Métricas
+
+_duracion: Dict[str, Histogram] = {}
+_resultados: Dict[tuple, int] = {}
+_lock = threading.Lock()
+
+def _contar(tipo: str, resultado: str):
+    with _lock:
+        _resultados[(tipo, resultado)] = _resultados.get((tipo, resultado), 0) + 1
+
+@register_collector
+def _metricas_tareas():
+    return [
+        ("tareas_en_curso", "gauge", "Tareas en segundo plano ejecutándose en este proceso", cola.en_curso),
+        ("tareas_total", "counter", "Intentos de tareas terminados, por tipo y resultado (completada, pendiente = se reintenta, fallida)",
+         [("", {"tipo": tipo, "resultado": resultado}, valor) for (tipo, resultado), valor in sorted(_resultados.items())]),
+        ("tareas_duracion_seconds", "histogram", "Duración de cada intento, por tipo",
+         [muestra for tipo, histograma in sorted(_duracion.items()) for muestra in histograma.samples({"tipo": tipo})]),
+    ]
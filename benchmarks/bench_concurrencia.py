@@ -0,0 +1,109 @@
+"""
+Benchmark de carga concurrente contra la API.
+
+Levanta la aplicación con uvicorn sobre una base SQLite local y simula la
+latencia de red de la base remota agregando una pausa a cada sentencia SQL.
+Luego dispara peticiones concurrentes a GET /vehiculos/ y GET /marcas/{id}
+y reporta peticiones por segundo.
+
+Uso:
+    python benchmarks/bench_concurrencia.py --requests 400 --concurrency 50 --db-latency-ms 20
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=20.0,
+                        help="Pausa agregada a cada sentencia SQL para simular el round-trip")
+    parser.add_argument("--port", type=int, default=8765)
+    return parser.parse_args()
+
+
+def seed(SessionLocal, models):
+    db = SessionLocal()
+    concesionaria = models.Concesionaria(nombre="Benchmark")
+    marca = models.Marca(nombre="Marca Benchmark")
+    db.add_all([concesionaria, marca])
+    db.flush()
+    for i in range(200):
+        db.add(models.Vehiculo(
+            modelo=f"Modelo {i}", anio=2000 + i % 25, color="gris", estado="usado",
+            precio=10000 + i, descripcion="Vehículo de prueba",
+            marca_id=marca.id, concesionaria_id=concesionaria.id
+        ))
+    db.commit()
+    db.close()
+
+
+def main():
+    args = parse_args()
+    tmpdir = tempfile.mkdtemp(prefix="bench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    import uvicorn
+    from sqlalchemy import event
+    from app.main import app
+    from app.database import engine, SessionLocal
+    from app import models
+
+    models.Base.metadata.create_all(bind=engine)
+    seed(SessionLocal, models)
+
+    latencia = args.db_latency_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _simular_latencia(*_):
+        time.sleep(latencia)
+
+    server = uvicorn.Server(uvicorn.Config(app, port=args.port, log_level="warning"))
+    hilo = threading.Thread(target=server.run, daemon=True)
+    hilo.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    urls = [f"http://127.0.0.1:{args.port}/vehiculos/?limit=20",
+            f"http://127.0.0.1:{args.port}/marcas/1"]
+
+    def pedir(i):
+        try:
+            with urllib.request.urlopen(urls[i % len(urls)]) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        estados = list(pool.map(pedir, range(args.requests)))
+    duracion = time.perf_counter() - inicio
+
+    server.should_exit = True
+    hilo.join()
+
+    print(json.dumps({
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "db_latency_ms": args.db_latency_ms,
+        "errores": sum(1 for e in estados if e != 200),
+        "duracion_s": round(duracion, 3),
+        "requests_por_segundo": round(args.requests / duracion, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
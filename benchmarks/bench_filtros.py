@@ -0,0 +1,141 @@
+"""
+Benchmark de los filtros del listado de vehículos.
+
+Genera un inventario sintético (por defecto 1M de vehículos), y para cada
+combinación de filtros habitual de la tienda muestra el plan de ejecución
+y el tiempo de la consulta que arma filtros.filtrar_vehiculos, para
+verificar que usa los índices compuestos declarados en models.Vehiculo.
+
+Uso:
+    python benchmarks/bench_filtros.py --rows 1000000
+    python benchmarks/bench_filtros.py --database-url postgresql://... --rows 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ESCENARIOS = {
+    "concesionaria_estado_precio": dict(concesionaria_id=3, estado="usado", precio_min=20000, precio_max=30000),
+    "marca_anio": dict(marca_id=5, anio_min=2015, anio_max=2018),
+    "estado_orden_precio": dict(estado="0km", orden="precio"),
+    "modelo_prefijo": dict(modelo="hilux"),
+    "orden_anio_desc": dict(orden="-anio"),
+}
+
+MODELOS = ["Hilux", "Corolla", "Ranger", "Amarok", "Gol", "Onix", "Cronos", "208", "Kangoo", "Focus"]
+ESTADOS = ["usado", "0km", "importado"]
+COLORES = ["blanco", "negro", "gris", "rojo", "azul"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--database-url", default=None,
+                        help="Base donde generar el inventario (por defecto un SQLite temporal)")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    return parser.parse_args()
+
+
+def seed(db, models, rows):
+    from sqlalchemy import insert
+    rnd = random.Random(42)
+    db.execute(insert(models.Concesionaria), [{"nombre": f"Concesionaria {i}"} for i in range(1, 21)])
+    db.execute(insert(models.Marca), [{"nombre": f"Marca {i}"} for i in range(1, 31)])
+    bloque = []
+    for i in range(rows):
+        bloque.append({
+            "modelo": f"{rnd.choice(MODELOS)} {rnd.randint(1, 500)}",
+            "anio": rnd.randint(1990, 2025),
+            "color": rnd.choice(COLORES),
+            "estado": rnd.choice(ESTADOS),
+            "precio": rnd.randint(1000, 100000),
+            "descripcion": "Vehículo generado para el benchmark",
+            "marca_id": rnd.randint(1, 30),
+            "concesionaria_id": rnd.randint(1, 20),
+        })
+        if len(bloque) == 10000:
+            db.execute(insert(models.Vehiculo), bloque)
+            bloque = []
+    if bloque:
+        db.execute(insert(models.Vehiculo), bloque)
+    db.commit()
+
+
+def plan(db, sql):
+    from sqlalchemy import text
+    if db.bind.dialect.name == "sqlite":
+        filas = db.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        return [fila[-1] for fila in filas]
+    filas = db.execute(text(f"EXPLAIN {sql}")).fetchall()
+    return [fila[0] for fila in filas]
+
+
+def main():
+    args = parse_args()
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="bench_")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    from sqlalchemy import text
+    from app import models, schemas
+    from app.database import engine, SessionLocal
+    from app.filtros import columnas_orden, filtrar_vehiculos
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+
+    inicio = time.perf_counter()
+    seed(db, models, args.rows)
+    seed_s = time.perf_counter() - inicio
+    db.execute(text("ANALYZE vehiculos" if engine.dialect.name == "postgresql" else "ANALYZE"))
+    db.commit()
+
+    resultados = {}
+    for nombre, parametros in ESCENARIOS.items():
+        parametros = dict(parametros)
+        orden = parametros.pop("orden", "id")
+        filtros = schemas.FiltrosVehiculo(**parametros)
+        query = (
+            filtrar_vehiculos(db.query(models.Vehiculo), filtros)
+            .order_by(*columnas_orden(orden))
+            .limit(args.limit)
+        )
+        sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+
+        tiempos = []
+        for _ in range(args.repeticiones):
+            t = time.perf_counter()
+            query.all()
+            tiempos.append(time.perf_counter() - t)
+            db.expunge_all()
+        tiempos.sort()
+
+        resultados[nombre] = {
+            "filtros": ESCENARIOS[nombre],
+            "plan": plan(db, sql),
+            "p50_ms": round(tiempos[len(tiempos) // 2] * 1000, 3),
+            "max_ms": round(tiempos[-1] * 1000, 3),
+        }
+
+    db.close()
+    print(json.dumps({
+        "dialecto": engine.dialect.name,
+        "filas": args.rows,
+        "seed_s": round(seed_s, 1),
+        "escenarios": resultados,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
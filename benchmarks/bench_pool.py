@@ -0,0 +1,178 @@
+"""
+Prueba de carga para dimensionar el pool de conexiones.
+
+Para cada tamaño de pool en --pool-sizes levanta la API (un worker de
+uvicorn) sobre una base SQLite local con latencia simulada por sentencia,
+le aplica carga concurrente y mide throughput, latencia de las peticiones y
+latencia de checkout del pool (el tiempo que una petición espera por una
+conexión libre). Con eso elige el menor pool que alcanza el throughput
+máximo y calcula cuántas conexiones abre en total cada cantidad de workers,
+contra el límite de conexiones del servidor.
+
+Uso:
+    python benchmarks/bench_pool.py --pool-sizes 2,5,10,20 --concurrency 40 --workers 1,2,4
+    python benchmarks/bench_pool.py --max-connections 100 --reserva 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pool-sizes", default="2,5,10,20")
+    parser.add_argument("--max-overflow", type=int, default=0,
+                        help="Overflow durante la prueba (0 para medir solo el tamaño del pool)")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    parser.add_argument("--workers", default="1,2,4,8", help="Cantidades de workers de uvicorn a evaluar")
+    parser.add_argument("--max-connections", type=int, default=100,
+                        help="max_connections del servidor Postgres")
+    parser.add_argument("--reserva", type=int, default=10,
+                        help="Conexiones reservadas para migraciones, consola y monitoreo")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--hijo", type=int, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def seed(SessionLocal, models):
+    db = SessionLocal()
+    concesionaria = models.Concesionaria(nombre="Benchmark")
+    marca = models.Marca(nombre="Marca Benchmark")
+    db.add_all([concesionaria, marca])
+    db.flush()
+    for i in range(200):
+        db.add(models.Vehiculo(
+            modelo=f"Modelo {i}", anio=2000 + i % 25, color="gris", estado="usado",
+            precio=10000 + i, descripcion="Vehículo de prueba",
+            marca_id=marca.id, concesionaria_id=concesionaria.id
+        ))
+    db.commit()
+    db.close()
+
+
+def correr_hijo(args):
+    """Una medición con DB_POOL_SIZE=args.hijo, en un proceso propio"""
+    import uvicorn
+    from sqlalchemy import event
+    from app.main import app
+    from app.database import engine, SessionLocal, checkout_latency, PoolInstrumentado
+    from app import models
+
+    models.Base.metadata.create_all(bind=engine)
+    seed(SessionLocal, models)
+
+    latencia = args.db_latency_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _simular_latencia(*_):
+        time.sleep(latencia)
+
+    server = uvicorn.Server(uvicorn.Config(app, port=args.port, log_level="warning"))
+    hilo = threading.Thread(target=server.run, daemon=True)
+    hilo.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    url = f"http://127.0.0.1:{args.port}/vehiculos/?limit=20"
+
+    def pedir(_):
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url) as resp:
+                resp.read()
+                estado = resp.status
+        except urllib.error.HTTPError as e:
+            estado = e.code
+        return estado, time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        resultados = list(pool.map(pedir, range(args.requests)))
+    duracion = time.perf_counter() - inicio
+
+    server.should_exit = True
+    hilo.join()
+
+    tiempos = sorted(t for _, t in resultados)
+    print(json.dumps({
+        "pool_size": args.hijo,
+        "errores": sum(1 for estado, _ in resultados if estado != 200),
+        "requests_por_segundo": round(args.requests / duracion, 1),
+        "p50_ms": round(tiempos[len(tiempos) // 2] * 1000, 1),
+        "p95_ms": round(tiempos[int(len(tiempos) * 0.95)] * 1000, 1),
+        "checkout_p95_ms": round(checkout_latency.quantile(0.95) * 1000, 1),
+        "timeouts": PoolInstrumentado.timeouts,
+    }))
+
+
+def main():
+    args = parse_args()
+    if args.hijo is not None:
+        correr_hijo(args)
+        return
+
+    mediciones = []
+    for tamaño in [int(t) for t in args.pool_sizes.split(",")]:
+        tmpdir = tempfile.mkdtemp(prefix="bench_")
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+            "DB_POOL_SIZE": str(tamaño),
+            "DB_MAX_OVERFLOW": str(args.max_overflow),
+            "THREADPOOL_SIZE": str(args.concurrency),
+            "RESPONSE_CACHE_ENABLED": "false",
+        }
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *sys.argv[1:], "--hijo", str(tamaño)],
+            env=env, capture_output=True, text=True, check=True
+        )
+        mediciones.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+
+    # Menor pool que logra al menos el 95% del mejor throughput
+    mejor = max(m["requests_por_segundo"] for m in mediciones)
+    recomendado = min(
+        (m for m in mediciones if m["requests_por_segundo"] >= 0.95 * mejor),
+        key=lambda m: m["pool_size"]
+    )["pool_size"]
+
+    disponibles = args.max_connections - args.reserva
+    workers = []
+    for cantidad in [int(w) for w in args.workers.split(",")]:
+        # Con varios workers la carga se reparte; el pool de cada uno se
+        # acota por las conexiones que el servidor puede dar
+        por_worker = disponibles // cantidad
+        tamaño = min(recomendado, por_worker)
+        overflow = max(min(tamaño, por_worker - tamaño), 0)
+        workers.append({
+            "workers": cantidad,
+            "DB_POOL_SIZE": tamaño,
+            "DB_MAX_OVERFLOW": overflow,
+            "conexiones_maximas": cantidad * (tamaño + overflow),
+            "limitado_por_servidor": tamaño < recomendado,
+        })
+
+    print(json.dumps({
+        "concurrency_por_worker": args.concurrency,
+        "db_latency_ms": args.db_latency_ms,
+        "mediciones": mediciones,
+        "pool_recomendado_por_worker": recomendado,
+        "conexiones_disponibles": disponibles,
+        "por_cantidad_de_workers": workers,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
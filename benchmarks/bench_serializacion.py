@@ -0,0 +1,151 @@
+"""
+Microbenchmark de la serialización del listado de vehículos.
+
+Compara, para una página de vehículos con sus imágenes, la ruta anterior
+(objetos del ORM con selectinload → validación from_attributes de
+schemas.Vehiculo → jsonable_encoder → json) con la ruta rápida de
+app/serializacion.py (consulta por columnas → dicts → orjson). Reporta por
+separado el tiempo de consulta y el de serialización, y el total de la
+petición GET /vehiculos/ completa.
+
+Uso:
+    python benchmarks/bench_serializacion.py --vehiculos 2000 --imagenes 4 --limit 100
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vehiculos", type=int, default=2000)
+    parser.add_argument("--imagenes", type=int, default=4, help="Imágenes por vehículo")
+    parser.add_argument("--limit", type=int, default=100, help="Vehículos por página")
+    parser.add_argument("--repeticiones", type=int, default=200)
+    return parser.parse_args()
+
+
+def seed(db, models, vehiculos, imagenes):
+    from sqlalchemy import insert
+    db.execute(insert(models.Concesionaria), [{"nombre": "Benchmark"}])
+    db.execute(insert(models.Marca), [{"nombre": "Marca Benchmark"}])
+    db.execute(insert(models.Vehiculo), [{
+        "modelo": f"Modelo {i}", "anio": 2000 + i % 25, "color": "gris", "estado": "usado",
+        "precio": 10000 + i, "descripcion": "Vehículo de prueba con una descripción de largo habitual " * 3,
+        "marca_id": 1, "concesionaria_id": 1,
+    } for i in range(vehiculos)])
+    db.execute(insert(models.Imagen), [{
+        "url": f"https://res.cloudinary.com/demo/image/upload/v1/vehiculos/{i}_{j}.jpg",
+        "vehiculo_id": i + 1,
+    } for i in range(vehiculos) for j in range(imagenes)])
+    db.commit()
+
+
+def medir(fn, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t)
+    tiempos.sort()
+    return {
+        "p50_ms": round(tiempos[len(tiempos) // 2] * 1000, 3),
+        "p95_ms": round(tiempos[int(len(tiempos) * 0.95)] * 1000, 3),
+    }
+
+
+def main():
+    args = parse_args()
+    tmpdir = tempfile.mkdtemp(prefix="bench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+
+    from typing import List
+    from fastapi import Depends
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from fastapi.testclient import TestClient
+    from pydantic import TypeAdapter
+    from sqlalchemy.orm import selectinload
+    from app import models, schemas
+    from app.database import engine, SessionLocal, get_db
+    from app.main import app
+    from app.serializacion import COLUMNAS_VEHICULO, RespuestaJSONRapida, vehiculos_planos
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    seed(db, models, args.vehiculos, args.imagenes)
+
+    adapter = TypeAdapter(List[schemas.Vehiculo])
+
+    def consulta_orm():
+        objetos = (
+            db.query(models.Vehiculo)
+            .options(selectinload(models.Vehiculo.imagenes))
+            .order_by(models.Vehiculo.id)
+            .limit(args.limit)
+            .all()
+        )
+        db.expunge_all()
+        return objetos
+
+    def consulta_columnas():
+        filas = db.query(*COLUMNAS_VEHICULO).order_by(models.Vehiculo.id).limit(args.limit).all()
+        return vehiculos_planos(db, filas)
+
+    # Las imágenes quedan cargadas por selectinload antes de desasociar los
+    # objetos, así la serialización no dispara consultas
+    objetos = consulta_orm()
+    planos = consulta_columnas()
+
+    def serializar_actual():
+        return JSONResponse(jsonable_encoder(adapter.validate_python(objetos, from_attributes=True))).body
+
+    def serializar_rapida():
+        return RespuestaJSONRapida(planos).body
+
+    assert json.loads(serializar_actual()) == json.loads(serializar_rapida())
+
+    # La ruta anterior completa, para comparar la petición de punta a punta
+    @app.get("/bench/vehiculos-orm", response_model=List[schemas.Vehiculo])
+    def vehiculos_orm(limit: int = 100, db=Depends(get_db)):
+        return (
+            db.query(models.Vehiculo)
+            .options(selectinload(models.Vehiculo.imagenes))
+            .order_by(models.Vehiculo.id)
+            .limit(limit)
+            .all()
+        )
+
+    client = TestClient(app)
+
+    resultados = {
+        "actual": {
+            "consulta": medir(consulta_orm, args.repeticiones),
+            "serializacion": medir(serializar_actual, args.repeticiones),
+            "peticion_completa": medir(lambda: client.get(f"/bench/vehiculos-orm?limit={args.limit}"), args.repeticiones),
+        },
+        "rapida": {
+            "consulta": medir(consulta_columnas, args.repeticiones),
+            "serializacion": medir(serializar_rapida, args.repeticiones),
+            "peticion_completa": medir(lambda: client.get(f"/vehiculos/?limit={args.limit}"), args.repeticiones),
+        },
+    }
+    db.close()
+    print(json.dumps({
+        "vehiculos": args.vehiculos,
+        "imagenes_por_vehiculo": args.imagenes,
+        "limit": args.limit,
+        "bytes": len(serializar_rapida()),
+        "resultados": resultados,
+    }, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
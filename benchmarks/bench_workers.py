@@ -0,0 +1,162 @@
+"""
+Escalado del throughput con la cantidad de workers de gunicorn.
+
+Crea una base SQLite local con las migraciones y datos de prueba, y para
+cada cantidad en --workers levanta gunicorn con gunicorn.conf.py, le aplica
+carga concurrente desde varios procesos cliente y mide peticiones por
+segundo y latencia. La ruta por defecto (listado de 100 vehículos sin
+caché) está acotada por CPU, así que el throughput debería crecer con los
+workers hasta la cantidad de núcleos disponibles.
+
+Uso:
+    python benchmarks/bench_workers.py --workers 1,2,4 --requests 2000 --concurrency 32
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=",".join(str(2 ** i) for i in range(4) if 2 ** i <= 2 * (os.cpu_count() or 1)))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32, help="Conexiones simultáneas en total")
+    parser.add_argument("--clientes", type=int, default=max(1, min(4, (os.cpu_count() or 1) // 2)),
+                        help="Procesos que generan la carga (un cliente en un solo proceso se satura antes que la API)")
+    parser.add_argument("--path", default="/vehiculos/?limit=100")
+    parser.add_argument("--vehiculos", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8768)
+    return parser.parse_args()
+
+
+def preparar_base(env, vehiculos):
+    """Aplica las migraciones y carga datos de prueba en un proceso aparte"""
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], env=env, cwd=ROOT, check=True, capture_output=True)
+    codigo = f"""
+from app.database import SessionLocal
+from app import models
+db = SessionLocal()
+concesionaria = models.Concesionaria(nombre="Benchmark")
+marca = models.Marca(nombre="Marca Benchmark")
+db.add_all([concesionaria, marca])
+db.flush()
+for i in range({vehiculos}):
+    vehiculo = models.Vehiculo(
+        modelo=f"Modelo {{i}}", anio=2000 + i % 25, color="gris", estado="usado",
+        precio=10000 + i, descripcion="Vehículo de prueba",
+        marca_id=marca.id, concesionaria_id=concesionaria.id
+    )
+    db.add(vehiculo)
+    db.flush()
+    db.add_all([models.Imagen(url=f"/media/{{vehiculo.id}}_{{j}}.jpg", vehiculo_id=vehiculo.id) for j in range(3)])
+db.commit()
+db.close()
+"""
+    subprocess.run([sys.executable, "-c", codigo], env=env, cwd=ROOT, check=True)
+
+
+def esperar(url, timeout=30):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                if resp.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.1)
+    return False
+
+
+def pedir(url):
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=30) as resp:
+            resp.read()
+            estado = resp.status
+    except urllib.error.HTTPError as e:
+        estado = e.code
+    except (urllib.error.URLError, OSError):
+        estado = 0
+    return estado, time.perf_counter() - inicio
+
+
+def cliente(url, requests, concurrency):
+    """Un proceso de carga: `requests` peticiones con `concurrency` hilos"""
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(pedir, [url] * requests))
+
+
+def medir(url, args):
+    por_cliente = args.requests // args.clientes
+    hilos = max(1, args.concurrency // args.clientes)
+    cliente(url, 20, 4)  # calentamiento: conexiones del pool y cachés de SQLAlchemy
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.clientes) as pool:
+        partes = list(pool.map(cliente, [url] * args.clientes, [por_cliente] * args.clientes, [hilos] * args.clientes))
+    duracion = time.perf_counter() - inicio
+    resultados = [r for parte in partes for r in parte]
+    tiempos = sorted(t for _, t in resultados)
+    return {
+        "errores": sum(1 for estado, _ in resultados if estado != 200),
+        "requests_por_segundo": round(len(resultados) / duracion, 1),
+        "p50_ms": round(tiempos[len(tiempos) // 2] * 1000, 1),
+        "p95_ms": round(tiempos[int(len(tiempos) * 0.95)] * 1000, 1),
+    }
+
+
+def main():
+    args = parse_args()
+    tmpdir = tempfile.mkdtemp(prefix="bench_")
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmpdir, 'bench.db')}",
+        "STORAGE_BACKEND": "local",
+        "LOCAL_STORAGE_DIR": os.path.join(tmpdir, "media"),
+        "RESPONSE_CACHE_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "TAREAS_HABILITADAS": "false",
+        "LOG_LEVEL": "WARNING",
+        "PORT": str(args.port),
+    }
+    preparar_base(env, args.vehiculos)
+
+    mediciones = []
+    for cantidad in [int(w) for w in args.workers.split(",")]:
+        proceso = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn.conf.py"],
+            env={**env, "WEB_CONCURRENCY": str(cantidad)}, cwd=ROOT,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not esperar(f"http://127.0.0.1:{args.port}/"):
+                raise SystemExit(f"gunicorn no respondió con {cantidad} workers")
+            medicion = medir(f"http://127.0.0.1:{args.port}{args.path}", args)
+        finally:
+            proceso.terminate()
+            proceso.wait()
+        mediciones.append({"workers": cantidad, **medicion})
+
+    base = mediciones[0]["requests_por_segundo"]
+    for medicion in mediciones:
+        medicion["aceleracion"] = round(medicion["requests_por_segundo"] / base, 2)
+
+    print(json.dumps({
+        "nucleos": os.cpu_count(),
+        "path": args.path,
+        "concurrency": args.concurrency,
+        "clientes": args.clientes,
+        "mediciones": mediciones,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Configuración de gunicorn para servir la API con varios procesos:
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Cada worker es un proceso con su propio event loop (UvicornWorker). La
+aplicación se importa en cada worker después del fork, así que el engine y
+su pool de conexiones, el hilo de logs y la cola de tareas son propios de
+cada uno. Ver "Despliegue con varios workers" en el README para dimensionar
+WEB_CONCURRENCY y el pool.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Un worker por núcleo: los handlers son síncronos y la serialización usa CPU
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Los workers heredan la cantidad: con más de uno y sin REDIS_URL las
+# cachés en memoria quedan desactivadas (ver app/cache.py)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Sin preload: cada worker crea sus conexiones e hilos después del fork.
+# Con GUNICORN_PRELOAD=true el arranque es más rápido y comparte memoria;
+# los hooks de os.register_at_fork descartan en cada hijo las conexiones
+# y los hilos heredados del proceso principal.
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() == "true"
+
+# Al detenerse (deploy, SIGTERM) cada worker deja de aceptar conexiones y
+# espera a las peticiones en curso; pasado graceful_timeout se lo termina
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Un worker que no responde en este tiempo se reinicia
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# Reinicio periódico de workers para acotar el crecimiento de memoria (0 = nunca)
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+
+# Los logs de la aplicación ya salen en JSON por stdout; el access log de
+# gunicorn queda desactivado salvo que se pida
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+# IPs de los proxies cuyas cabeceras X-Forwarded-* se aceptan. Con "*"
+# uvicorn toma la primera entrada de X-Forwarded-For, que la elige el
+# cliente; por eso el valor por defecto solo confía en el proxy local. En
+# Render la IP del cliente la toma el límite de peticiones con
+# RATE_LIMIT_TRUST_PROXY (ver app/rate_limit.py).
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
@@ -0,0 +1,17 @@
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from app.database import engine
+
+# Aplicar las migraciones pendientes (preDeployCommand en Render). Una base
+# creada antes de usar migraciones (con el antiguo create_all) tiene las
+# tablas pero no alembic_version: primero se marca con el esquema inicial.
+config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+tablas = set(inspect(engine).get_table_names())
+if "alembic_version" not in tablas and "vehiculos" in tablas:
+    command.stamp(config, "0001_esquema_inicial")
+    print("Base existente marcada con 0001_esquema_inicial")
+command.upgrade(config, "head")
+
+print("¡Migraciones aplicadas!")
@@ -0,0 +1,10 @@
+from app.database import SessionLocal
+from app import models
+
+# Recalcular la tabla estadisticas_vehiculos a partir de los vehículos
+db = SessionLocal()
+models.reconstruir_estadisticas(db.connection())
+db.commit()
+db.close()
+
+print("¡Estadísticas de vehículos reconstruidas!")
@@ -0,0 +1,10 @@
+from app.database import SessionLocal
+from app import models
+
+# Recalcular la proyección vehiculos_resumen a partir de las tablas de origen
+db = SessionLocal()
+models.reconstruir_resumen(db.connection())
+db.commit()
+db.close()
+
+print("¡Resumen de vehículos reconstruido!")
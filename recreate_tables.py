@@ -1,10 +1,15 @@
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
 from app.database import engine
 from app import models
 
-# Eliminar todas las tablas existentes
+# Eliminar todas las tablas existentes (y el registro de migraciones aplicadas)
 models.Base.metadata.drop_all(bind=engine)
+with engine.begin() as conn:
+    conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
 
-# Crear todas las tablas nuevamente
-models.Base.metadata.create_all(bind=engine)
+# Crear todas las tablas nuevamente con las migraciones
+command.upgrade(Config("alembic.ini"), "head")
 
-print("¡Tablas recreadas exitosamente!") 
\ No newline at end of file
+print("¡Tablas recreadas exitosamente!")
\ No newline at end of file
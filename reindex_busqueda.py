@@ -0,0 +1,10 @@
+from app.database import SessionLocal
+from app.busqueda import actualizar_texto_busqueda
+
+# Recalcular el texto de búsqueda de todos los vehículos
+db = SessionLocal()
+actualizar_texto_busqueda(db)
+db.commit()
+db.close()
+
+print("¡Índice de búsqueda actualizado!")
@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+# La app lee la configuración al importarse: base SQLite temporal, sin
+# caché, sin límite de peticiones y sin cola de tareas
+_tmpdir = tempfile.mkdtemp(prefix="tests_")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_tmpdir, 'tests.db')}",
+    "STORAGE_BACKEND": "local",
+    "LOCAL_STORAGE_DIR": os.path.join(_tmpdir, "media"),
+    "RESPONSE_CACHE_ENABLED": "false",
+    "RATE_LIMIT_ENABLED": "false",
+    "TAREAS_HABILITADAS": "false",
+    "LOG_LEVEL": "WARNING",
+})
+
+import pytest
+from fastapi.testclient import TestClient
+from app import models
+from app.database import SessionLocal, engine
+from app.main import app
+
+
+@pytest.fixture
+def db():
+    models.Base.metadata.create_all(bind=engine)
+    sesion = SessionLocal()
+    try:
+        yield sesion
+    finally:
+        sesion.close()
+        models.Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(db):
+    with TestClient(app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def auth_headers(client, db):
+    """Cabecera Authorization de un usuario de la concesionaria 1"""
+    concesionaria = models.Concesionaria(nombre="Concesionaria del usuario")
+    db.add(concesionaria)
+    db.commit()
+    respuesta = client.post("/usuarios/", json={
+        "nombre": "Usuario", "email": "usuario@example.com", "contraseña": "secreta-123",
+        "concesionaria_id": concesionaria.id,
+    })
+    assert respuesta.status_code == 200
+    respuesta = client.post("/token", data={"username": "usuario@example.com", "password": "secreta-123"})
+    return {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
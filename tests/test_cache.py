@@ -0,0 +1,75 @@
+import pytest
+from app import models, response_cache
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(response_cache.response_cache, "backend", response_cache.MemoryBackend())
+
+
+def test_escritura_invalida_el_listado(client, auth_headers):
+    assert client.get("/marcas/").headers["x-cache"] == "MISS"
+    assert client.get("/marcas/").headers["x-cache"] == "HIT"
+
+    assert client.post("/marcas/", json={"nombre": "Fiat"}, headers=auth_headers).status_code == 200
+
+    respuesta = client.get("/marcas/")
+    assert respuesta.headers["x-cache"] == "MISS"
+    assert [m["nombre"] for m in respuesta.json()] == ["Fiat"]
+
+
+def test_escritura_invalida_solo_lo_que_modifica(client, db, auth_headers):
+    db.add_all([models.Marca(nombre="Fiat"), models.Marca(nombre="Ford")])
+    db.commit()
+    client.get("/marcas/1")
+    client.get("/marcas/2")
+
+    assert client.put("/marcas/1", json={"nombre": "Fiat Italia"}, headers=auth_headers).status_code == 200
+
+    assert client.get("/marcas/1").json()["nombre"] == "Fiat Italia"
+    assert client.get("/marcas/2").headers["x-cache"] == "HIT"
+
+
+def test_parametros_codificados_no_comparten_clave(client, db):
+    """?color=rojo%26estado%3Dusado es un solo parámetro, no estado=usado&color=rojo"""
+    concesionaria, marca = models.Concesionaria(nombre="C"), models.Marca(nombre="M")
+    db.add_all([concesionaria, marca])
+    db.flush()
+    db.add(models.Vehiculo(
+        modelo="Gol", anio=2010, color="rojo", estado="usado", precio=1000, descripcion="",
+        marca_id=marca.id, concesionaria_id=concesionaria.id
+    ))
+    db.commit()
+
+    assert client.get("/vehiculos/?color=rojo%26estado%3Dusado").json() == []
+    respuesta = client.get("/vehiculos/?estado=usado&color=rojo")
+    assert respuesta.headers["x-cache"] == "MISS"
+    assert len(respuesta.json()) == 1
+
+
+def test_invalidacion_durante_el_handler(client, db, monkeypatch):
+    """Una respuesta calculada antes de una escritura no se sirve después de ella"""
+    from app.routers import marcas
+    original = marcas.paginar_por_cursor
+    db.add(models.Marca(nombre="Fiat"))
+    db.commit()
+
+    def escritura_concurrente(*args, **kwargs):
+        response_cache.invalidar("marcas")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(marcas, "paginar_por_cursor", escritura_concurrente)
+    assert client.get("/marcas/?cursor=").headers["x-cache"] == "MISS"
+    assert client.get("/marcas/?cursor=").headers["x-cache"] == "MISS"
+
+
+def test_cache_en_memoria_desactivada_con_varios_workers(monkeypatch):
+    from app import cache
+    monkeypatch.delenv("USER_CACHE_ENABLED", raising=False)
+    monkeypatch.setattr(cache, "WEB_CONCURRENCY", 1)
+    assert cache.cache_en_memoria_habilitada("USER_CACHE_ENABLED")
+    monkeypatch.setattr(cache, "WEB_CONCURRENCY", 2)
+    assert not cache.cache_en_memoria_habilitada("USER_CACHE_ENABLED")
+    monkeypatch.setenv("USER_CACHE_ENABLED", "true")
+    assert cache.cache_en_memoria_habilitada("USER_CACHE_ENABLED")
@@ -0,0 +1,37 @@
+from app import models
+from app.database import count_queries
+
+VEHICULOS = 30
+
+
+def _cargar_vehiculos(db, cantidad):
+    concesionaria = models.Concesionaria(nombre="Concesionaria")
+    marca = models.Marca(nombre="Toyota")
+    db.add_all([concesionaria, marca])
+    db.flush()
+    for i in range(cantidad):
+        vehiculo = models.Vehiculo(
+            modelo=f"Hilux {i}", anio=2020, color="gris", estado="usado", precio=10000 + i,
+            descripcion="4x4", marca_id=marca.id, concesionaria_id=concesionaria.id
+        )
+        db.add(vehiculo)
+        db.flush()
+        db.add_all([models.Imagen(url=f"/media/{vehiculo.id}_{j}.jpg", vehiculo_id=vehiculo.id) for j in range(3)])
+    db.commit()
+
+
+def test_listado_cantidad_de_consultas_constante(client, db):
+    """Una página cuesta las mismas consultas sin importar cuántos vehículos trae (sin N+1)"""
+    _cargar_vehiculos(db, VEHICULOS)
+
+    consultas = {}
+    for limit in (1, 10, VEHICULOS):
+        with count_queries() as queries:
+            respuesta = client.get("/vehiculos/", params={"limit": limit})
+        assert respuesta.status_code == 200
+        assert len(respuesta.json()) == limit
+        assert all(len(vehiculo["imagenes"]) == 3 for vehiculo in respuesta.json())
+        consultas[limit] = len(queries)
+
+    assert consultas[1] == consultas[10] == consultas[VEHICULOS]
+
@@ -0,0 +1,132 @@
+import json
+import pytest
+from app import models
+from app.estadisticas import estadisticas_vehiculos
+
+
+@pytest.fixture
+def inventario(client, db, auth_headers):
+    """Dos marcas y vehículos de la concesionaria del usuario y de otra"""
+    otra = models.Concesionaria(nombre="Otra concesionaria")
+    fiat, ford = models.Marca(nombre="Fiat"), models.Marca(nombre="Ford")
+    db.add_all([otra, fiat, ford])
+    db.commit()
+    propia = db.query(models.Concesionaria).filter(models.Concesionaria.id != otra.id).one().id
+    db.add_all([
+        models.Vehiculo(modelo="Uno", anio=2010, color="rojo", estado="usado", precio=None, descripcion="",
+                        marca_id=fiat.id, concesionaria_id=otra.id),
+        models.Vehiculo(modelo="Ka", anio=2015, color="gris", estado="usado", precio=5000, descripcion="",
+                        marca_id=ford.id, concesionaria_id=otra.id),
+    ])
+    db.commit()
+    ids = [_crear(client, auth_headers, propia, fiat.id, estado, precio)
+           for estado, precio in [("usado", 1000), ("usado", 2000), ("usado", 3000), ("nuevo", 9000)]]
+    return {"propia": propia, "otra": otra.id, "fiat": fiat.id, "ford": ford.id, "ids": ids}
+
+
+def _crear(client, auth_headers, concesionaria_id, marca_id, estado, precio):
+    respuesta = client.post("/vehiculos/", headers=auth_headers, json=_datos(concesionaria_id, marca_id, estado, precio))
+    assert respuesta.status_code == 200
+    return respuesta.json()["id"]
+
+
+def _datos(concesionaria_id, marca_id, estado, precio):
+    return {
+        "modelo": "Palio", "anio": 2012, "color": "blanco", "estado": estado, "precio": precio,
+        "descripcion": "", "marca_id": marca_id, "concesionaria_id": concesionaria_id,
+    }
+
+
+def _normalizar(estadisticas):
+    estadisticas = dict(estadisticas)
+    estadisticas["por_marca"] = sorted(estadisticas["por_marca"], key=lambda marca: marca["marca_id"])
+    return estadisticas
+
+
+def _verificar(client, db, inventario):
+    """Los agregados incrementales coinciden con un GROUP BY recalculado desde cero"""
+    db.expire_all()
+    endpoints = [("/vehiculos/stats", None)] + [
+        (f"/concesionarias/{inventario[c]}/stats", inventario[c]) for c in ("propia", "otra")
+    ]
+    obtenidas = {url: _normalizar(client.get(url).json()) for url, _ in endpoints}
+
+    models.reconstruir_estadisticas(db.connection())
+    esperadas = {
+        url: _normalizar(json.loads(estadisticas_vehiculos(db, concesionaria_id).model_dump_json()))
+        for url, concesionaria_id in endpoints
+    }
+    db.rollback()
+    assert obtenidas == esperadas
+    return obtenidas
+
+
+def test_alta(client, db, inventario):
+    total = _verificar(client, db, inventario)["/vehiculos/stats"]
+    assert total["cantidad"] == 6
+    assert total["precio"] == {"minimo": 1000, "promedio": 4000.0, "maximo": 9000}
+
+
+@pytest.mark.parametrize("posicion, precio", [(0, 1500), (0, 99999), (3, 500), (3, 8000)])
+def test_cambio_de_precio_del_minimo_o_maximo(client, db, auth_headers, inventario, posicion, precio):
+    vehiculo_id = inventario["ids"][posicion]
+    estado = "nuevo" if posicion == 3 else "usado"
+    datos = _datos(inventario["propia"], inventario["fiat"], estado, precio)
+    assert client.put(f"/vehiculos/{vehiculo_id}", headers=auth_headers, json=datos).status_code == 200
+    _verificar(client, db, inventario)
+
+
+@pytest.mark.parametrize("posicion", [0, 2, 3])
+def test_baja_del_minimo_o_maximo(client, db, auth_headers, inventario, posicion):
+    assert client.delete(f"/vehiculos/{inventario['ids'][posicion]}", headers=auth_headers).status_code == 200
+    _verificar(client, db, inventario)
+
+
+def test_cambio_de_marca(client, db, auth_headers, inventario):
+    datos = _datos(inventario["propia"], inventario["ford"], "usado", 1000)
+    assert client.put(f"/vehiculos/{inventario['ids'][0]}", headers=auth_headers, json=datos).status_code == 200
+    por_marca = _verificar(client, db, inventario)[f"/concesionarias/{inventario['propia']}/stats"]["por_marca"]
+    assert [marca["cantidad"] for marca in por_marca] == [3, 1]
+
+
+def test_cambio_de_estado(client, db, auth_headers, inventario):
+    datos = _datos(inventario["propia"], inventario["fiat"], "nuevo", 3000)
+    assert client.put(f"/vehiculos/{inventario['ids'][2]}", headers=auth_headers, json=datos).status_code == 200
+    propia = _verificar(client, db, inventario)[f"/concesionarias/{inventario['propia']}/stats"]
+    assert propia["por_estado"] == {"usado": 2, "nuevo": 2}
+
+
+def test_grupo_que_queda_vacio(client, db, auth_headers, inventario):
+    assert client.delete(f"/vehiculos/{inventario['ids'][3]}", headers=auth_headers).status_code == 200
+    propia = _verificar(client, db, inventario)[f"/concesionarias/{inventario['propia']}/stats"]
+    assert propia["por_estado"] == {"usado": 3}
+    assert db.query(models.EstadisticaVehiculos).filter_by(concesionaria_id=inventario["propia"], estado="nuevo").count() == 0
+
+
+def test_precio_nulo(client, db, inventario):
+    """Cambios fuera de la API: un vehículo que pierde o recupera el precio"""
+    uno = db.query(models.Vehiculo).filter_by(modelo="Uno").one()
+    uno.precio = 100
+    db.commit()
+    _verificar(client, db, inventario)
+    ka = db.query(models.Vehiculo).filter_by(modelo="Ka").one()
+    ka.precio = None
+    db.commit()
+    _verificar(client, db, inventario)
+
+
+def test_importacion(client, db, auth_headers, inventario):
+    filas = [
+        _datos(inventario["propia"], inventario["ford"], "usado", 500),
+        _datos(inventario["propia"], inventario["ford"], "usado", 700),
+        _datos(inventario["propia"], inventario["fiat"], "usado", 99999),
+        _datos(inventario["propia"], inventario["fiat"], "reservado", 4000),
+    ]
+    archivo = "".join(json.dumps({**fila, "descripcion": "Importado"}) + "\n" for fila in filas)
+    respuesta = client.post(
+        "/vehiculos/importar", headers=auth_headers,
+        files={"file": ("vehiculos.ndjson", archivo, "application/x-ndjson")}
+    )
+    assert respuesta.json()["importados"] == 4
+    total = _verificar(client, db, inventario)["/vehiculos/stats"]
+    assert total["cantidad"] == 10
@@ -0,0 +1,30 @@
+import pytest
+from app import models
+
+
+@pytest.fixture
+def vehiculos(db):
+    concesionaria = models.Concesionaria(nombre="Concesionaria")
+    marca = models.Marca(nombre="Toyota")
+    db.add_all([concesionaria, marca])
+    db.flush()
+    for modelo in ["Hilux SRV", "hilux SR", "Hiace", "Corolla", "Hi_lux", "Hi%lux"]:
+        db.add(models.Vehiculo(
+            modelo=modelo, anio=2020, color="gris", estado="usado", precio=1000,
+            descripcion="", marca_id=marca.id, concesionaria_id=concesionaria.id
+        ))
+    db.commit()
+
+
+@pytest.mark.parametrize("prefijo, esperados", [
+    ("hilux", {"Hilux SRV", "hilux SR"}),
+    ("HI", {"Hilux SRV", "hilux SR", "Hiace", "Hi_lux", "Hi%lux"}),
+    ("hi_", {"Hi_lux"}),
+    ("hi%", {"Hi%lux"}),
+    ("\U0010ffff", set()),
+    ("hi\U0010ffff", set()),
+])
+def test_filtro_prefijo_de_modelo(client, vehiculos, prefijo, esperados):
+    respuesta = client.get("/vehiculos/", params={"modelo": prefijo})
+    assert respuesta.status_code == 200
+    assert {v["modelo"] for v in respuesta.json()} == esperados
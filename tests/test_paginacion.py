@@ -0,0 +1,57 @@
+import pytest
+from app import models
+from app.pagination import NEXT_CURSOR_HEADER, encode_cursor
+
+
+@pytest.fixture
+def vehiculos(db):
+    concesionaria = models.Concesionaria(nombre="Concesionaria")
+    marca = models.Marca(nombre="Ford")
+    db.add_all([concesionaria, marca])
+    db.flush()
+    # Precios repetidos y vehículos sin precio (datos anteriores a la validación)
+    precios = [30000, None, 10000, 20000, 10000, None, 50000, 20000, None, 40000, 10000]
+    for i, precio in enumerate(precios):
+        db.add(models.Vehiculo(
+            modelo=f"Ranger {i}", anio=2015 + i % 3, color="azul", estado="usado", precio=precio,
+            descripcion="", marca_id=marca.id, concesionaria_id=concesionaria.id
+        ))
+    db.commit()
+    return {v.id: v.precio for v in db.query(models.Vehiculo)}
+
+
+def _recorrer(client, path, orden, limit):
+    ids, cursor = [], ""
+    for _ in range(50):
+        respuesta = client.get(path, params={"cursor": cursor, "limit": limit, "orden": orden})
+        assert respuesta.status_code == 200
+        ids += [v["id"] for v in respuesta.json()]
+        cursor = respuesta.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return ids
+    raise AssertionError("la paginación no terminó")
+
+
+@pytest.mark.parametrize("path", ["/vehiculos/", "/vehiculos/resumen"])
+@pytest.mark.parametrize("orden", ["id", "precio", "-precio"])
+@pytest.mark.parametrize("limit", [1, 2, 4])
+def test_cursor_recorre_todo_sin_repetir(client, vehiculos, path, orden, limit):
+    ids = _recorrer(client, path, orden, limit)
+
+    con_precio = [i for i in vehiculos if vehiculos[i] is not None]
+    sin_precio = sorted(i for i in vehiculos if vehiculos[i] is None)
+    if orden == "id":
+        esperado = sorted(vehiculos)
+    elif orden == "precio":
+        esperado = sorted(con_precio, key=lambda i: (vehiculos[i], i)) + sin_precio
+    else:
+        # NULL al final también en orden descendente
+        esperado = sorted(con_precio, key=lambda i: (-vehiculos[i], -i)) + sorted(sin_precio, reverse=True)
+    assert ids == esperado
+
+
+@pytest.mark.parametrize("valores", [[{"a": 1}, 1], [None, None], ["10", 1], [True, 1], [1], "x"])
+def test_cursor_alterado_responde_400(client, vehiculos, valores):
+    cursor = encode_cursor("precio", valores)
+    respuesta = client.get("/vehiculos/", params={"cursor": cursor, "orden": "precio"})
+    assert respuesta.status_code == 400
@@ -0,0 +1,50 @@
+import pytest
+from app import rate_limit
+
+LOGIN_OK = {"username": "usuario@example.com", "password": "secreta-123"}
+LOGIN_MAL = {"username": "usuario@example.com", "password": "incorrecta"}
+
+
+@pytest.fixture
+def limitador(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_TRUST_PROXY", True)
+    monkeypatch.setattr(rate_limit.rate_limiter, "backend", rate_limit.MemoryRateLimitBackend())
+    monkeypatch.setattr(rate_limit, "REGLAS", [
+        rate_limit._regla("token", "POST", r"^/token$", solo_fallos="email", ip="3/3600", email="3/3600"),
+        rate_limit._regla("lectura", "GET", r"^/marcas/", ip="2/3600"),
+    ])
+
+
+def _login(client, datos, ip):
+    return client.post("/token", data=datos, headers={"X-Forwarded-For": ip})
+
+
+def test_rechaza_con_retry_after(client, limitador):
+    assert client.get("/marcas/").status_code == 200
+    assert client.get("/marcas/").status_code == 200
+    respuesta = client.get("/marcas/")
+    assert respuesta.status_code == 429
+    assert int(respuesta.headers["retry-after"]) > 0
+
+
+def test_login_correcto_no_cobra_el_email(client, auth_headers, limitador):
+    for ip in ["10.0.0.1", "10.0.0.2", "10.0.0.3", "10.0.0.4"]:
+        assert _login(client, LOGIN_OK, ip).status_code == 200
+
+
+def test_rechazo_por_ip_no_agota_el_email(client, auth_headers, limitador):
+    """Un atacante que agota su bucket de IP no bloquea la cuenta de la víctima"""
+    assert _login(client, LOGIN_MAL, "10.0.0.66").status_code == 401
+    assert _login(client, LOGIN_MAL, "10.0.0.66").status_code == 401
+    assert _login(client, LOGIN_OK, "10.0.0.66").status_code == 200
+    for _ in range(10):
+        assert _login(client, LOGIN_MAL, "10.0.0.66").status_code == 429
+
+    assert _login(client, LOGIN_OK, "10.0.0.1").status_code == 200
+
+
+def test_logins_fallidos_agotan_el_email(client, auth_headers, limitador):
+    for ip in ["10.0.0.1", "10.0.0.2", "10.0.0.3"]:
+        assert _login(client, LOGIN_MAL, ip).status_code == 401
+    assert _login(client, LOGIN_OK, "10.0.0.4").status_code == 429
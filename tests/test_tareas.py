@@ -0,0 +1,68 @@
+from datetime import timedelta
+import pytest
+from app import models, tareas
+
+
+@pytest.fixture
+def cola(db, monkeypatch):
+    """Registra un tipo de tarea de prueba que falla mientras `fallar` sea True"""
+    estado = {"fallar": False, "llamadas": 0}
+
+    def prueba():
+        estado["llamadas"] += 1
+        if estado["fallar"]:
+            raise RuntimeError("falló")
+
+    monkeypatch.setitem(tareas._tareas, "prueba", prueba)
+    monkeypatch.setattr(tareas, "backoff", lambda intentos: 0)
+    return estado
+
+
+def _encolar(db, **valores):
+    db_tarea = tareas.encolar(db, "prueba")
+    for campo, valor in valores.items():
+        setattr(db_tarea, campo, valor)
+    db.commit()
+    return db_tarea.id
+
+
+def _tarea(db, tarea_id):
+    db.expire_all()
+    return db.get(models.Tarea, tarea_id)
+
+
+def test_una_tarea_se_reclama_una_sola_vez(db, cola):
+    tarea_id = _encolar(db)
+    db_tarea = tareas._reclamar()
+    assert (db_tarea.id, db_tarea.intentos) == (tarea_id, 1)
+    assert tareas._reclamar() is None
+
+    assert tareas._ejecutar(db_tarea) == "completada"
+    assert cola["llamadas"] == 1
+    assert _tarea(db, tarea_id).estado == "completada"
+
+
+def test_reintenta_hasta_agotar_los_intentos(db, cola):
+    cola["fallar"] = True
+    tarea_id = _encolar(db, max_intentos=3)
+    resultados = []
+    while (db_tarea := tareas._reclamar()) is not None:
+        resultados.append(tareas._ejecutar(db_tarea))
+    assert resultados == ["pendiente", "pendiente", "fallida"]
+    assert _tarea(db, tarea_id).error == "RuntimeError: falló"
+
+
+def test_plazo_vencido_se_retoma_si_quedan_intentos(db, cola):
+    vencido = models.ahora() - timedelta(seconds=1)
+    tarea_id = _encolar(db, estado="en_curso", intentos=1, max_intentos=3, disponible_en=vencido)
+    db_tarea = tareas._reclamar()
+    assert (db_tarea.id, db_tarea.intentos) == (tarea_id, 2)
+
+
+def test_plazo_vencido_sin_intentos_queda_fallida(db, cola):
+    vencido = models.ahora() - timedelta(seconds=1)
+    tarea_id = _encolar(db, estado="en_curso", intentos=3, max_intentos=3, disponible_en=vencido)
+    assert tareas._reclamar() is None
+    db_tarea = _tarea(db, tarea_id)
+    assert (db_tarea.estado, db_tarea.intentos) == ("fallida", 3)
+    assert db_tarea.error == "Plazo vencido tras agotar los intentos"